@@ -6,31 +6,38 @@ an AssertionError during class creation. Patch typing._generic_init_subclass
 early so importing SQLAlchemy inside this package doesn't fail at import time.
 
 This shim is intentionally minimal and only swallows AssertionError raised by
-the original hook — it preserves original behavior for all other cases.
+the original hook — it preserves original behavior for all other cases. It is
+only installed on 3.13, so other versions keep typing's own hook and don't pay
+for an extra call on every generic subclass creation.
 """
 
 from __future__ import annotations
 
-try:
-    import typing as _typing
-
-    _orig = getattr(_typing, "_generic_init_subclass", None)
-
-    if _orig is not None:
-
-        def _patched_generic_init_subclass(cls, *args, **kwargs):
-            try:
-                return _orig(cls, *args, **kwargs)
-            except AssertionError:
-                # Compatibility fallback: accept the subclass creation even if
-                # typing's stricter check would raise. This mirrors the intent
-                # of typing internals but avoids breaking imports for libs
-                # that rely on slightly different internals across Python
-                # versions.
-                return None
-
-        _typing._generic_init_subclass = _patched_generic_init_subclass
-except Exception:
-    # If anything goes wrong with the shim, fall back to default behavior —
-    # we don't want to crash application import just from the shim.
-    pass
+import sys
+
+if sys.version_info[:2] == (3, 13):
+    try:
+        import functools
+        import typing as _typing
+
+        _orig = getattr(_typing, "_generic_init_subclass", None)
+
+        if _orig is not None:
+
+            @functools.wraps(_orig)
+            def _patched_generic_init_subclass(cls, *args, **kwargs):
+                try:
+                    return _orig(cls, *args, **kwargs)
+                except AssertionError:
+                    # Compatibility fallback: accept the subclass creation even
+                    # if typing's stricter check would raise. This mirrors the
+                    # intent of typing internals but avoids breaking imports
+                    # for libs that rely on slightly different internals
+                    # across Python versions.
+                    return None
+
+            _typing._generic_init_subclass = _patched_generic_init_subclass
+    except Exception:
+        # If anything goes wrong with the shim, fall back to default behavior —
+        # we don't want to crash application import just from the shim.
+        pass
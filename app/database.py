@@ -1,24 +1,62 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./product_listing.db")
 
+
+def _json_serializer(value):
+    # JSON columns go through orjson rather than the stdlib json module.
+    # OPT_SERIALIZE_NUMPY covers numpy scalars coming out of pandas, and
+    # OPT_NON_STR_KEYS keeps accepting e.g. numeric Excel headers as keys.
+    return orjson.dumps(
+        value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+
+
+if "sqlite" in DATABASE_URL:
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a mapping is being written, and
+        # synchronous=NORMAL is the recommended durability level under WAL.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+
+# Creates use INSERT ... RETURNING and updates fetch updated_at through the
+# models' eager_defaults, so objects stay loaded after commit instead of being
+# refreshed with another SELECT.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    # Tests and scripts point the app at another database by setting
+    # app.state.SessionLocal; the app otherwise uses the engine above
+    session_factory = getattr(request.app.state, "SessionLocal", SessionLocal)
+    db = session_factory()
     try:
         yield db
     finally:
@@ -1,9 +1,17 @@
+import asyncio
+import os
+from filelock import FileLock
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import OperationalError
 from app.database import engine
 from app.models import Base
 from app.routers import marketplace, seller_file, mapping
+from app.services import worker_pool
+
+
+SCHEMA_LOCK_PATH = os.path.join(seller_file.UPLOAD_DIR, ".schema.lock")
 
 
 # Create database tables on startup. Doing this at import time can crash the
@@ -13,19 +21,31 @@ from app.routers import marketplace, seller_file, mapping
 # start and expose logs to help diagnose environment/volume issues.
 def create_tables_on_startup():
     try:
-        Base.metadata.create_all(bind=engine)
+        # With several workers booting at once only one runs the schema check;
+        # the others wait for it and then find every table already there.
+        with FileLock(SCHEMA_LOCK_PATH):
+            Base.metadata.create_all(bind=engine)
     except OperationalError as exc:
         # Log a helpful message; avoid importing logging to keep this small.
         print(
             "WARNING: could not create database tables on startup:",
             str(exc),
         )
+    except Exception as exc:
+        # Anything else (a lock timeout, a permission error on the lock file,
+        # another driver error) is reported now too; otherwise it would only
+        # surface when shutdown awaits the task
+        print(
+            "WARNING: database table setup failed on startup:",
+            repr(exc),
+        )
 
 
 app = FastAPI(
     title="Product Listing System API",
     description="A backend system for managing marketplace templates, seller files, and data mapping",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -47,8 +67,21 @@ app.include_router(mapping.router)
 async def startup_event():
     # Attempt to create tables on startup (non-blocking). This will print a
     # warning if the database file isn't writable or available; the app will
-    # still start so operators can inspect logs and fix volumes/env.
-    create_tables_on_startup()
+    # still start so operators can inspect logs and fix volumes/env. It runs
+    # as a background thread so /health answers while a worker waits on the
+    # schema lock.
+    app.state.schema_task = asyncio.create_task(
+        asyncio.to_thread(create_tables_on_startup)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    try:
+        await app.state.schema_task
+    finally:
+        # Stop the worker processes used to parse and transform seller files
+        worker_pool.shutdown_pool()
 
 
 @app.get("/")
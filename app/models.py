@@ -15,6 +15,7 @@ from app.database import Base
 
 class MarketplaceTemplate(Base):
     __tablename__ = "marketplace_templates"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True)
@@ -29,12 +30,14 @@ class MarketplaceTemplate(Base):
 
 class SellerFile(Base):
     __tablename__ = "seller_files"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255))
     original_filename = Column(String(255))
     file_path = Column(String(500))
     file_type = Column(String(10))  # csv, xlsx
+    content_hash = Column(String(32), unique=True, index=True)  # BLAKE2b of the upload
     columns = Column(JSON)  # Store discovered columns
     sample_rows = Column(JSON)  # Store sample data
     row_count = Column(Integer)
@@ -46,14 +49,18 @@ class SellerFile(Base):
 
 class Mapping(Base):
     __tablename__ = "mappings"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200))
-    marketplace_template_id = Column(Integer, ForeignKey("marketplace_templates.id"))
-    seller_file_id = Column(Integer, ForeignKey("seller_files.id"))
+    marketplace_template_id = Column(
+        Integer, ForeignKey("marketplace_templates.id"), index=True
+    )
+    seller_file_id = Column(Integer, ForeignKey("seller_files.id"), index=True)
     column_mapping = Column(JSON)  # Store the mapping configuration
     validation_results = Column(JSON)  # Store validation results
-    transformed_data = Column(JSON)  # Store the transformed data
+    transformed_data_path = Column(String(500))  # Transformed rows file on disk
+    row_count = Column(Integer)  # Number of transformed rows
     is_valid = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
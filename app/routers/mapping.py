@@ -1,82 +1,267 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select, true
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import threading
 from app.database import get_db
 from app.models import Mapping, MarketplaceTemplate, SellerFile
-from app.schemas import MappingCreate, MappingResponse, TransformedDataResponse
-from app.services.transformation import DataTransformer
+from app.schemas import (
+    AttributeDefinition,
+    MappingCreate,
+    MappingResponse,
+    TransformedDataResponse,
+    ValidationResult,
+)
+from app.services.mapping_processor import MappingProcessor
+from app.services.transformed_store import TransformedDataStore
 from app.services.validation import DataValidator
+from app.services.worker_pool import POOL_SIZE, get_pool, shutdown_pool
 
 router = APIRouter(prefix="/api/mapping", tags=["mapping"])
 
+# Compiled once; the list endpoints serialize through it directly
+_MAPPING_LIST_ADAPTER = TypeAdapter(List[MappingResponse])
+
+# Most mappings returned by one page of the list endpoint
+_MAX_MAPPINGS_PAGE = 1000
+
+
+# Compiled templates by (id, created_at, updated_at): an edit bumps
+# updated_at, and created_at tells a deleted template from a new one that
+# reuses its id. Callers run on threadpool threads, hence the lock.
+_COMPILED_TEMPLATES: Dict[
+    Tuple[int, Optional[datetime], Optional[datetime]],
+    Dict[str, AttributeDefinition],
+] = {}
+_COMPILED_TEMPLATES_LOCK = threading.Lock()
+_MAX_COMPILED_TEMPLATES = 256
+
+
+def _get_compiled_template(
+    template: MarketplaceTemplate,
+) -> Dict[str, AttributeDefinition]:
+    """Return the template's AttributeDefinitions, built once per version"""
+    key = (template.id, template.created_at, template.updated_at)
+    compiled = _COMPILED_TEMPLATES.get(key)
+    if compiled is None:
+        compiled = DataValidator.compile_template(template.template)
+        with _COMPILED_TEMPLATES_LOCK:
+            if len(_COMPILED_TEMPLATES) >= _MAX_COMPILED_TEMPLATES:
+                # Dicts keep insertion order; drop the oldest entry
+                del _COMPILED_TEMPLATES[next(iter(_COMPILED_TEMPLATES))]
+            _COMPILED_TEMPLATES[key] = compiled
+    return compiled
+
+
+def _get_template_and_file(
+    db: Session, template_id: int, seller_file_id: int
+) -> Tuple[MarketplaceTemplate, SellerFile]:
+    """Load a mapping's marketplace template and seller file in one query"""
+
+    row = db.execute(
+        select(MarketplaceTemplate, SellerFile)
+        .join(SellerFile, true())
+        .where(
+            MarketplaceTemplate.id == template_id,
+            SellerFile.id == seller_file_id,
+        )
+    ).first()
+
+    if row is None:
+        # Only on the error path do we look again to report which one is missing
+        if db.get(MarketplaceTemplate, template_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Marketplace template not found",
+            )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Seller file not found"
+        )
+
+    return row.MarketplaceTemplate, row.SellerFile
+
+
+def _transform_and_validate(
+    mapping_data: MappingCreate,
+    marketplace_template: MarketplaceTemplate,
+    seller_file: SellerFile,
+) -> Tuple[List[Dict[str, Any]], str, int, ValidationResult]:
+    """Run a mapping's transformation and validation against its seller file.
+
+    The transformed rows are written to the store as they are produced;
+    returns the column mapping, the stored rows' path, the row count and
+    the validation result.
+    """
+
+    # Serialize the column mapping once and share it between the
+    # transformer, the validator and the stored record
+    column_mapping = [mapping.model_dump() for mapping in mapping_data.column_mapping]
+
+    # Large files are split into chunks that the worker processes transform
+    # and validate in parallel; with a single worker there's nothing to gain
+    executor = get_pool() if POOL_SIZE > 1 else None
+    try:
+        transformed_data_path, row_count, validation_result = (
+            MappingProcessor.process_file(
+                seller_file.file_path,
+                seller_file.file_type,
+                column_mapping,
+                _get_compiled_template(marketplace_template),
+                executor=executor,
+            )
+        )
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool for the
+        # next request instead of failing every request from now on.
+        shutdown_pool(executor)
+        raise
+
+    return column_mapping, transformed_data_path, row_count, validation_result
+
 
 @router.post("/", response_model=MappingResponse)
 async def create_mapping(mapping_data: MappingCreate, db: Session = Depends(get_db)):
     """Create a new column mapping"""
 
-    # Validate marketplace template exists
-    marketplace_template = (
-        db.query(MarketplaceTemplate)
-        .filter(MarketplaceTemplate.id == mapping_data.marketplace_template_id)
-        .first()
+    # Validate marketplace template and seller file exist
+    marketplace_template, seller_file = _get_template_and_file(
+        db, mapping_data.marketplace_template_id, mapping_data.seller_file_id
     )
 
-    if not marketplace_template:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Marketplace template not found",
-        )
-
-    # Validate seller file exists
-    seller_file = (
-        db.query(SellerFile)
-        .filter(SellerFile.id == mapping_data.seller_file_id)
-        .first()
+    # pandas/validation work is CPU bound; keep it off the event loop
+    (
+        column_mapping,
+        transformed_data_path,
+        row_count,
+        validation_result,
+    ) = await run_in_threadpool(
+        _transform_and_validate, mapping_data, marketplace_template, seller_file
     )
+    validation_results = validation_result.model_dump()
 
-    if not seller_file:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Seller file not found"
-        )
+    # Create mapping record
+    try:
+        db_mapping = db.scalars(
+            insert(Mapping)
+            .values(
+                name=mapping_data.name,
+                marketplace_template_id=mapping_data.marketplace_template_id,
+                seller_file_id=mapping_data.seller_file_id,
+                column_mapping=column_mapping,
+                validation_results=validation_results,
+                transformed_data_path=transformed_data_path,
+                row_count=row_count,
+                is_valid=validation_result.is_valid,
+            )
+            .returning(Mapping)
+        ).one()
+        db.commit()
+    except Exception:
+        db.rollback()
+        TransformedDataStore.delete(transformed_data_path)
+        raise
 
-    # Transform data
-    transformed_data = DataTransformer.transform_data(
-        seller_file.file_path,
-        seller_file.file_type,
-        [mapping.dict() for mapping in mapping_data.column_mapping],
-    )
+    return db_mapping
 
-    # Validate transformed data
-    validation_result = DataValidator.validate_data(
-        transformed_data,
-        marketplace_template.template,
-        [mapping.dict() for mapping in mapping_data.column_mapping],
-    )
 
-    # Create mapping record
-    db_mapping = Mapping(
-        name=mapping_data.name,
-        marketplace_template_id=mapping_data.marketplace_template_id,
-        seller_file_id=mapping_data.seller_file_id,
-        column_mapping=[mapping.dict() for mapping in mapping_data.column_mapping],
-        validation_results=validation_result.dict(),
-        transformed_data=transformed_data,
-        is_valid=validation_result.is_valid,
-    )
+@router.post("/bulk", response_model=List[MappingResponse])
+async def create_mappings_bulk(
+    mappings_data: List[MappingCreate], db: Session = Depends(get_db)
+):
+    """Create several column mappings with a single INSERT and commit"""
 
-    db.add(db_mapping)
-    db.commit()
-    db.refresh(db_mapping)
+    # An INSERT with no parameter sets would write one row of defaults
+    if not mappings_data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one mapping is required",
+        )
 
-    return db_mapping
+    rows = []
+    try:
+        for mapping_data in mappings_data:
+            marketplace_template, seller_file = _get_template_and_file(
+                db, mapping_data.marketplace_template_id, mapping_data.seller_file_id
+            )
+            (
+                column_mapping,
+                transformed_data_path,
+                row_count,
+                validation_result,
+            ) = await run_in_threadpool(
+                _transform_and_validate,
+                mapping_data,
+                marketplace_template,
+                seller_file,
+            )
+            rows.append(
+                {
+                    "name": mapping_data.name,
+                    "marketplace_template_id": mapping_data.marketplace_template_id,
+                    "seller_file_id": mapping_data.seller_file_id,
+                    "column_mapping": column_mapping,
+                    "validation_results": validation_result.model_dump(),
+                    "transformed_data_path": transformed_data_path,
+                    "row_count": row_count,
+                    "is_valid": validation_result.is_valid,
+                }
+            )
+
+        # The response lists the mappings in request order, which
+        # executemany RETURNING only guarantees when asked to
+        created = db.scalars(
+            insert(Mapping).returning(Mapping, sort_by_parameter_order=True), rows
+        ).all()
+        db.commit()
+    except Exception:
+        # A 404 part-way through the batch (or a failed insert) creates
+        # nothing, so remove the rows already written for earlier mappings
+        db.rollback()
+        for row in rows:
+            TransformedDataStore.delete(row["transformed_data_path"])
+        raise
+
+    return Response(
+        content=_MAPPING_LIST_ADAPTER.dump_json(
+            _MAPPING_LIST_ADAPTER.validate_python(created, from_attributes=True)
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/", response_model=List[MappingResponse])
-async def get_mappings(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all mappings"""
-
-    mappings = db.query(Mapping).offset(skip).limit(limit).all()
-    return mappings
+async def get_mappings(
+    last_id: int = 0,
+    limit: int = Query(100, ge=1, le=_MAX_MAPPINGS_PAGE),
+    skip: int = 0,
+    db: Session = Depends(get_db),
+):
+    """Get mappings by id; pass the last id of a page as last_id for the next.
+
+    skip still works for older clients, but it counts past rows one by one.
+    """
+
+    # Keyset pagination: the id index seeks straight to the page instead of
+    # scanning past every skipped row the way OFFSET does
+    mappings = db.scalars(
+        select(Mapping)
+        .where(Mapping.id > last_id)
+        .order_by(Mapping.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    # Pages are capped and the rows no longer carry the transformed data, so
+    # the page is validated as a whole before any of the response is sent
+    return Response(
+        content=_MAPPING_LIST_ADAPTER.dump_json(
+            _MAPPING_LIST_ADAPTER.validate_python(mappings, from_attributes=True)
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/{mapping_id}", response_model=MappingResponse)
@@ -104,7 +289,17 @@ async def get_transformed_data(mapping_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found"
         )
 
-    transformed_data = mapping.transformed_data or []
+    # Transformed rows are only loaded from disk for this endpoint
+    try:
+        transformed_data = TransformedDataStore.load(mapping.transformed_data_path)
+    except FileNotFoundError:
+        # The mapping's row says data was stored, so a missing file is lost
+        # data (e.g. a transformed directory that wasn't on a volume), not an
+        # empty result
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Transformed data file for this mapping is missing",
+        )
     validation_result = mapping.validation_results or {}
 
     # Calculate statistics
@@ -135,56 +330,41 @@ async def update_mapping(
             status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found"
         )
 
-    # Validate marketplace template exists
-    marketplace_template = (
-        db.query(MarketplaceTemplate)
-        .filter(MarketplaceTemplate.id == mapping_data.marketplace_template_id)
-        .first()
+    # Validate marketplace template and seller file exist
+    marketplace_template, seller_file = _get_template_and_file(
+        db, mapping_data.marketplace_template_id, mapping_data.seller_file_id
     )
 
-    if not marketplace_template:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Marketplace template not found",
-        )
-
-    # Validate seller file exists
-    seller_file = (
-        db.query(SellerFile)
-        .filter(SellerFile.id == mapping_data.seller_file_id)
-        .first()
-    )
-
-    if not seller_file:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Seller file not found"
-        )
-
-    # Transform data
-    transformed_data = DataTransformer.transform_data(
-        seller_file.file_path,
-        seller_file.file_type,
-        [mapping.dict() for mapping in mapping_data.column_mapping],
-    )
-
-    # Validate transformed data
-    validation_result = DataValidator.validate_data(
-        transformed_data,
-        marketplace_template.template,
-        [mapping.dict() for mapping in mapping_data.column_mapping],
+    # pandas/validation work is CPU bound; keep it off the event loop
+    (
+        column_mapping,
+        transformed_data_path,
+        row_count,
+        validation_result,
+    ) = await run_in_threadpool(
+        _transform_and_validate, mapping_data, marketplace_template, seller_file
     )
+    validation_results = validation_result.model_dump()
 
     # Update mapping
     mapping.name = mapping_data.name
     mapping.marketplace_template_id = mapping_data.marketplace_template_id
     mapping.seller_file_id = mapping_data.seller_file_id
-    mapping.column_mapping = [mapping.dict() for mapping in mapping_data.column_mapping]
-    mapping.validation_results = validation_result.dict()
-    mapping.transformed_data = transformed_data
+    mapping.column_mapping = column_mapping
+    mapping.validation_results = validation_results
+    previous_data_path = mapping.transformed_data_path
+    mapping.transformed_data_path = transformed_data_path
+    mapping.row_count = row_count
     mapping.is_valid = validation_result.is_valid
 
-    db.commit()
-    db.refresh(mapping)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        TransformedDataStore.delete(transformed_data_path)
+        raise
+
+    TransformedDataStore.delete(previous_data_path)
 
     return mapping
 
@@ -200,8 +380,12 @@ async def delete_mapping(mapping_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found"
         )
 
+    transformed_data_path = mapping.transformed_data_path
+
     db.delete(mapping)
     db.commit()
 
+    TransformedDataStore.delete(transformed_data_path)
+
     return {"message": "Mapping deleted successfully"}
 
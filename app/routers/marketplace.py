@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import exists, insert, select
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.models import MarketplaceTemplate
+from app.models import Mapping, MarketplaceTemplate
 from app.schemas import MarketplaceTemplateCreate, MarketplaceTemplateResponse
 
 router = APIRouter(prefix="/api/marketplace", tags=["marketplace"])
 
+# Built once at import; list endpoints serialize through it directly instead
+# of having FastAPI re-validate the response model on every request.
+_TEMPLATE_LIST_ADAPTER = TypeAdapter(List[MarketplaceTemplateResponse])
+
 
 @router.post("/templates", response_model=MarketplaceTemplateResponse)
 async def create_marketplace_template(
@@ -28,31 +34,21 @@ async def create_marketplace_template(
         )
 
     # Create new template
-    # `template_data.template` is declared as a Dict in the schema so it may
-    # already be a plain dict (coming from JSON). If it's a pydantic model
-    # instance, call .dict(), otherwise use it directly.
-    # Normalize template: ensure nested AttributeDefinition Pydantic objects
-    # are converted into plain dicts so they can be JSON-serialized by SQLAlchemy.
-    raw_template = (
-        template_data.template.dict()
-        if hasattr(template_data.template, "dict")
-        else template_data.template
-    )
-
-    template_value = {}
-    for key, val in raw_template.items():
-        # If val is a pydantic model-like object, convert to dict
-        template_value[key] = val.dict() if hasattr(val, "dict") else val
-
-    db_template = MarketplaceTemplate(
-        name=template_data.name,
-        description=template_data.description,
-        template=template_value,
-    )
-
-    db.add(db_template)
+    # model_dump recurses into the nested AttributeDefinition models, giving
+    # plain dicts that SQLAlchemy can JSON-serialize.
+    template_value = template_data.model_dump(include={"template"})["template"]
+
+    # RETURNING hands back every column, so no refresh is needed after commit
+    db_template = db.scalars(
+        insert(MarketplaceTemplate)
+        .values(
+            name=template_data.name,
+            description=template_data.description,
+            template=template_value,
+        )
+        .returning(MarketplaceTemplate)
+    ).one()
     db.commit()
-    db.refresh(db_template)
 
     return db_template
 
@@ -64,7 +60,12 @@ async def get_marketplace_templates(
     """Get all marketplace templates"""
 
     templates = db.query(MarketplaceTemplate).offset(skip).limit(limit).all()
-    return templates
+    return Response(
+        content=_TEMPLATE_LIST_ADAPTER.dump_json(
+            _TEMPLATE_LIST_ADAPTER.validate_python(templates, from_attributes=True)
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/templates/{template_id}", response_model=MarketplaceTemplateResponse)
@@ -125,19 +126,9 @@ async def update_marketplace_template(
     template.name = template_data.name
     template.description = template_data.description
     # Normalize update payload as well
-    raw_update = (
-        template_data.template.dict()
-        if hasattr(template_data.template, "dict")
-        else template_data.template
-    )
-    updated_template = {}
-    for key, val in raw_update.items():
-        updated_template[key] = val.dict() if hasattr(val, "dict") else val
-
-    template.template = updated_template
+    template.template = template_data.model_dump(include={"template"})["template"]
 
     db.commit()
-    db.refresh(template)
 
     return template
 
@@ -157,8 +148,11 @@ async def delete_marketplace_template(template_id: int, db: Session = Depends(ge
             status_code=status.HTTP_404_NOT_FOUND, detail="Template not found"
         )
 
-    # Check if template is being used in any mappings
-    if template.mappings:
+    # Check if template is being used in any mappings (EXISTS avoids loading
+    # the whole mappings collection)
+    if db.scalar(
+        select(exists().where(Mapping.marketplace_template_id == template_id))
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete template that is being used in mappings",
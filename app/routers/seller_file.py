@@ -1,21 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Response,
+    UploadFile,
+    File,
+    status,
+)
+from pydantic import TypeAdapter
+from sqlalchemy import exists, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
+import asyncio
+import hashlib
 import os
-from datetime import datetime
+import time
+from concurrent.futures.process import BrokenProcessPool
 from app.database import get_db
-from app.models import SellerFile
+from app.models import Mapping, SellerFile
 from app.schemas import SellerFileResponse
 from app.services.file_parser import FileParser
+from app.services.worker_pool import get_pool, shutdown_pool
 from fastapi.concurrency import run_in_threadpool
-from types import SimpleNamespace
-import io
 
 router = APIRouter(prefix="/api/seller-file", tags=["seller-file"])
 
+# Serializer for the file list endpoint, built once at import
+_FILE_LIST_ADAPTER = TypeAdapter(List[SellerFileResponse])
+
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+_UPLOAD_PREFIX = UPLOAD_DIR + os.sep
+
+# Uploads are copied to disk in fixed-size chunks so large files never have to
+# be held in memory as a single bytes object.
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _save_upload(source, file_path: str) -> str:
+    """Copy an uploaded file object to ``file_path`` chunk by chunk.
+
+    Returns a BLAKE2b hex digest of the content, computed as it is written.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "wb") as buffer:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            buffer.write(chunk)
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _parse_in_pool(file_path: str, file_extension: str):
+    """Parse a stored upload in a worker process, retrying once on a fresh
+    pool if a worker died"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_pool()
+        try:
+            return await loop.run_in_executor(
+                pool, FileParser.parse_path, file_path, file_extension
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool so this
+            # and later uploads don't keep failing on it
+            await run_in_threadpool(shutdown_pool, pool)
+            if attempt:
+                raise
 
 
 @router.post("/upload", response_model=SellerFileResponse)
@@ -32,49 +84,71 @@ async def upload_seller_file(
             detail="Only CSV and Excel files are supported",
         )
 
+    # A hex nanosecond timestamp is cheaper than strftime and keeps two
+    # uploads of the same name within one second from overwriting each other
+    filename = f"{time.time_ns():x}_{file.filename}"
+    file_path = _UPLOAD_PREFIX + filename
+
     try:
-        # Read uploaded file bytes in the async context to avoid passing
-        # coroutine objects into threadpool worker where they can't be
-        # awaited. Then wrap bytes in a simple sync object for parsing.
-        content = await file.read()
-
-        sync_file = SimpleNamespace(
-            filename=file.filename,
-            read=lambda content=content: content,
-            file=io.BytesIO(content),
+        # Stream the upload straight to its final location in the threadpool,
+        # then parse it from disk in a worker process.
+        content_hash = await run_in_threadpool(_save_upload, file.file, file_path)
+
+        # Identical content has already been parsed and stored; hand back the
+        # existing record rather than parsing it again.
+        existing = db.scalar(
+            select(SellerFile).where(SellerFile.content_hash == content_hash)
         )
+        if existing is not None:
+            os.remove(file_path)
+            return existing
 
-        # Parse the file using a threadpool to avoid blocking the event loop
-        columns, sample_rows, row_count = await run_in_threadpool(
-            FileParser.parse_file, sync_file
+        columns, sample_rows, row_count = await _parse_in_pool(
+            file_path, file_extension
         )
 
-        # Save file to disk (write bytes directly)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-
         # Save to database
-        db_file = SellerFile(
-            filename=filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            file_type=file_extension,
-            columns=columns,
-            sample_rows=sample_rows,
-            row_count=row_count,
-        )
-
-        db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        try:
+            db_file = db.scalars(
+                insert(SellerFile)
+                .values(
+                    filename=filename,
+                    original_filename=file.filename,
+                    file_path=file_path,
+                    file_type=file_extension,
+                    content_hash=content_hash,
+                    columns=columns,
+                    sample_rows=sample_rows,
+                    row_count=row_count,
+                )
+                .returning(SellerFile)
+            ).one()
+            db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content won the race
+            db.rollback()
+            existing = db.scalar(
+                select(SellerFile).where(SellerFile.content_hash == content_hash)
+            )
+            if existing is None:
+                raise
+            os.remove(file_path)
+            return existing
 
         return db_file
 
+    except BrokenProcessPool:
+        # The workers kept dying; that's the server's fault, not the file's
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="File parsing workers are unavailable, please retry",
+        )
     except Exception as e:
+        # Don't leave unparseable or unrecorded uploads behind
+        if os.path.exists(file_path):
+            os.remove(file_path)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error processing file: {str(e)}",
@@ -88,7 +162,12 @@ async def get_seller_files(
     """Get all uploaded seller files"""
 
     files = db.query(SellerFile).offset(skip).limit(limit).all()
-    return files
+    return Response(
+        content=_FILE_LIST_ADAPTER.dump_json(
+            _FILE_LIST_ADAPTER.validate_python(files, from_attributes=True)
+        ),
+        media_type="application/json",
+    )
 
 
 @router.get("/files/{file_id}", response_model=SellerFileResponse)
@@ -116,8 +195,9 @@ async def delete_seller_file(file_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
         )
 
-    # Check if file is being used in any mappings
-    if file.mappings:
+    # Check if file is being used in any mappings (EXISTS avoids loading the
+    # whole mappings collection)
+    if db.scalar(select(exists().where(Mapping.seller_file_id == file_id))):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete file that is being used in mappings",
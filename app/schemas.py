@@ -102,7 +102,7 @@ class MappingResponse(BaseModel):
     seller_file_id: int
     column_mapping: List[Dict[str, Any]]
     validation_results: Optional[Dict[str, Any]]
-    transformed_data: Optional[List[Dict[str, Any]]]
+    row_count: Optional[int]
     is_valid: bool
     created_at: datetime
     updated_at: Optional[datetime]
@@ -121,6 +121,8 @@ class ValidationResult(BaseModel):
     is_valid: bool
     errors: List[ValidationError]
     warnings: List[str] = []
+    # Set when validation stopped reporting errors at max_errors
+    truncated: bool = False
 
 
 class TransformedDataResponse(BaseModel):
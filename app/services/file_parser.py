@@ -1,8 +1,10 @@
 import pandas as pd
-import os
-from typing import List, Dict, Any, Tuple
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import python_calamine
+import io
+from typing import List, Dict, Any, Tuple, Union, BinaryIO
 from fastapi import UploadFile, HTTPException
-import tempfile
 
 
 class FileParser:
@@ -14,79 +16,195 @@ class FileParser:
         Parse uploaded CSV/Excel file and return columns, sample rows, and row count
         """
         try:
-            # Create temporary file and write uploaded content. We support
-            # both FastAPI UploadFile (which exposes async read) and simple
-            # objects used in tests that provide a synchronous read().
-            suffix = f".{file.filename.split('.')[-1]}"
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=suffix, mode="wb"
-            ) as temp_file:
-                # Prefer calling file.read() (tests often set this). If not
-                # available, fall back to file.file.read().
-                if hasattr(file, "read") and callable(file.read):
-                    content = file.read()
-                elif (
-                    hasattr(file, "file")
-                    and hasattr(file.file, "read")
-                    and callable(file.file.read)
-                ):
-                    content = file.file.read()
-                else:
-                    raise ValueError("Uploaded file object has no readable content")
-
-                # If the read returned a string, encode to bytes.
-                if isinstance(content, str):
-                    content = content.encode()
-
-                # Ensure we have bytes-like content
-                if not isinstance(content, (bytes, bytearray)):
-                    # Some mocks may still return Mock objects; try to call them
-                    if callable(content):
-                        content = content()
-                    if not isinstance(content, (bytes, bytearray)):
-                        raise ValueError("File.read() did not return bytes")
+            # We support both FastAPI UploadFile (which exposes async read)
+            # and simple objects used in tests that provide a synchronous
+            # read(). Prefer calling file.read() (tests often set this). If
+            # not available, fall back to file.file.read().
+            if hasattr(file, "read") and callable(file.read):
+                content = file.read()
+            elif (
+                hasattr(file, "file")
+                and hasattr(file.file, "read")
+                and callable(file.file.read)
+            ):
+                content = file.file.read()
+            else:
+                raise ValueError("Uploaded file object has no readable content")
 
-                temp_file.write(content)
-                temp_file_path = temp_file.name
+            # If the read returned a string, encode to bytes.
+            if isinstance(content, str):
+                content = content.encode()
 
-            # Determine file type and parse accordingly
+            # Ensure we have bytes-like content
+            if not isinstance(content, (bytes, bytearray)):
+                # Some mocks may still return Mock objects; try to call them
+                if callable(content):
+                    content = content()
+                if not isinstance(content, (bytes, bytearray)):
+                    raise ValueError("File.read() did not return bytes")
+
+            # Parse the bytes in memory rather than copying them to a
+            # temporary file first
             file_extension = file.filename.split(".")[-1].lower()
+            return FileParser._parse_source(io.BytesIO(content), file_extension)
 
-            if file_extension == "csv":
-                df = pd.read_csv(temp_file_path)
-            elif file_extension in ["xlsx", "xls"]:
-                df = pd.read_excel(temp_file_path)
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Unsupported file type. Only CSV and Excel files are supported.",
-                )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error parsing file: {str(e)}")
 
-            # Clean up temporary file
-            os.unlink(temp_file_path)
+    @staticmethod
+    def parse_path(
+        file_path: str, file_type: str
+    ) -> Tuple[List[str], List[Dict[str, Any]], int]:
+        """
+        Parse a CSV/Excel file already stored on disk and return columns,
+        sample rows, and row count.
+
+        Errors are raised as plain exceptions rather than HTTPException so
+        this can run in a worker process (HTTPException doesn't pickle).
+        """
+        return FileParser._parse_source(file_path, file_type)
 
-            # Normalize column names: strip whitespace and remove BOM if present
-            def _clean_col(c):
-                if not isinstance(c, str):
-                    return c
-                # Remove BOM and strip whitespace
-                return c.replace("\ufeff", "").strip()
+    @staticmethod
+    def _parse_source(
+        source: Union[str, BinaryIO], file_type: str
+    ) -> Tuple[List[str], List[Dict[str, Any]], int]:
+        """
+        Shared parsing for a file path or a seekable binary buffer
+        """
+        if file_type == "csv":
+            try:
+                return FileParser._parse_csv(source)
+            except pa.ArrowInvalid:
+                # pyarrow rejects ragged rows (e.g. missing trailing
+                # fields); pandas pads those with NaN, so fall back to it.
+                return FileParser._parse_csv_with_pandas(source)
+        elif file_type in ["xlsx", "xls"]:
+            # Only the sample rows need a DataFrame; the row count comes from
+            # the sheet's used range, so the rest is never converted.
+            df = pd.read_excel(source, nrows=5, engine="calamine")
+            # Excel headers may be numbers or dates, which .str would turn
+            # into NaN, so these are cleaned one by one
+            df.rename(columns=FileParser._clean_col, inplace=True)
+            FileParser._rewind(source)
+            row_count = FileParser._count_excel_rows(source)
+        else:
+            raise ValueError(
+                "Unsupported file type. Only CSV and Excel files are supported."
+            )
+
+        # Get columns
+        columns = df.columns.tolist()
+
+        # Get sample rows (first 5 rows)
+        sample_rows = df.head(5).to_dict("records")
+
+        return columns, sample_rows, row_count
 
-            df.rename(columns=_clean_col, inplace=True)
+    @staticmethod
+    def _parse_csv_with_pandas(
+        source: Union[str, BinaryIO]
+    ) -> Tuple[List[str], List[Dict[str, Any]], int]:
+        """
+        Parse a CSV with pandas, for files the pyarrow reader can't handle the
+        way get_file_data (pandas) reads them
+        """
+        # memory_map only applies to real files
+        FileParser._rewind(source)
+        df = pd.read_csv(
+            source,
+            memory_map=isinstance(source, str),
+            engine="c",
+            encoding="utf-8-sig",
+        )
+        # CSV headers are always strings, so strip them in one call
+        df.columns = df.columns.str.strip()
+        return df.columns.tolist(), df.head(5).to_dict("records"), len(df)
 
-            # Get columns
-            columns = df.columns.tolist()
+    @staticmethod
+    def _parse_csv(source: Union[str, BinaryIO]) -> Tuple[List[str], List[Dict[str, Any]], int]:
+        """
+        Parse a CSV with pyarrow's streaming reader. Only the first block is
+        converted for the sample rows; the row count is taken from a second
+        pass that converts a single column.
+        """
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=1 << 20)
+        reader = pacsv.open_csv(
+            source,
+            read_options=read_options,
+            # Match pandas: empty cells become nulls rather than ""
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+        )
+        raw_columns = reader.schema.names
+        if len(set(raw_columns)) < len(raw_columns):
+            # pyarrow keeps repeated headers as they are, while pandas renames
+            # them (A, A.1, ...); the advertised columns have to match the
+            # names get_file_data gives them for mapping
+            reader.close()
+            return FileParser._parse_csv_with_pandas(source)
+        try:
+            first_batch = reader.read_next_batch()
+        except StopIteration:
+            # Header-only file
+            first_batch = pa.RecordBatch.from_pylist([], schema=reader.schema)
+        finally:
+            reader.close()
+
+        sample = pa.Table.from_batches([first_batch]).slice(0, 5)
+        # pyarrow already drops a leading BOM; only whitespace is left to strip
+        sample = sample.rename_columns(pd.Index(raw_columns).str.strip().tolist())
+        # pyarrow infers dates/timestamps that pandas would leave as text;
+        # cast them back so sample rows stay JSON serializable.
+        for i, field in enumerate(sample.schema):
+            if pa.types.is_temporal(field.type):
+                sample = sample.set_column(
+                    i, field.name, sample.column(i).cast(pa.string())
+                )
 
-            # Get sample rows (first 5 rows)
-            sample_rows = df.head(5).to_dict("records")
+        row_count = 0
+        if raw_columns:
+            # Reading one column as plain strings keeps the count pass cheap
+            # and immune to type inference changing between blocks.
+            FileParser._rewind(source)
+            counter = pacsv.open_csv(
+                source,
+                read_options=read_options,
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=raw_columns[:1],
+                    column_types={raw_columns[0]: pa.string()},
+                ),
+            )
+            row_count = sum(batch.num_rows for batch in counter)
+
+        return sample.column_names, sample.to_pylist(), row_count
 
-            # Get row count
-            row_count = len(df)
+    @staticmethod
+    def _count_excel_rows(source: Union[str, BinaryIO]) -> int:
+        """Count data rows in the first sheet without converting its cells"""
+        if isinstance(source, str):
+            workbook = python_calamine.CalamineWorkbook.from_path(source)
+        else:
+            workbook = python_calamine.CalamineWorkbook.from_filelike(source)
+        try:
+            end = workbook.get_sheet_by_index(0).end
+            # end is the zero-based (row, col) of the last non-empty cell, so
+            # with the header on the first row it is also the data row count
+            # (matching pandas, which drops trailing empty rows)
+            return end[0] if end is not None else 0
+        finally:
+            workbook.close()
 
-            return columns, sample_rows, row_count
+    @staticmethod
+    def _rewind(source: Union[str, BinaryIO]) -> None:
+        """Seek a buffer back to the start before it is read again"""
+        if not isinstance(source, str):
+            source.seek(0)
 
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Error parsing file: {str(e)}")
+    @staticmethod
+    def _clean_col(c):
+        """Normalize a column name: strip whitespace and remove BOM if present"""
+        if not isinstance(c, str):
+            return c
+        return c.replace("\ufeff", "").strip()
 
     @staticmethod
     def get_file_data(file_path: str, file_type: str) -> pd.DataFrame:
@@ -95,23 +213,13 @@ class FileParser:
         """
         try:
             if file_type == "csv":
-                df = pd.read_csv(file_path)
+                df = pd.read_csv(file_path, encoding="utf-8-sig")
                 # Normalize headers
-                df.rename(
-                    columns=lambda c: (
-                        c.replace("\ufeff", "").strip() if isinstance(c, str) else c
-                    ),
-                    inplace=True,
-                )
+                df.columns = df.columns.str.strip()
                 return df
             elif file_type in ["xlsx", "xls"]:
-                df = pd.read_excel(file_path)
-                df.rename(
-                    columns=lambda c: (
-                        c.replace("\ufeff", "").strip() if isinstance(c, str) else c
-                    ),
-                    inplace=True,
-                )
+                df = pd.read_excel(file_path, engine="calamine")
+                df.rename(columns=FileParser._clean_col, inplace=True)
                 return df
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,123 @@
+from collections import deque
+from concurrent.futures import Executor
+from itertools import starmap
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import pandas as pd
+from app.schemas import AttributeDefinition, ValidationError, ValidationResult
+from app.services.file_parser import FileParser
+from app.services.transformation import CHUNK_SIZE, DataTransformer
+from app.services.transformed_store import TransformedDataStore
+from app.services.validation import MAX_ERRORS, DataValidator
+from app.services.worker_pool import POOL_SIZE
+
+# Chunks handed to the pool ahead of the one being written; enough to keep
+# every worker busy without holding the whole file's chunks in flight
+_CHUNKS_IN_FLIGHT = 2 * POOL_SIZE
+
+_ChunkTask = Tuple[
+    pd.DataFrame,
+    Dict[str, Dict[str, str]],
+    Dict[str, AttributeDefinition],
+    List[Dict[str, str]],
+    int,
+]
+
+
+class MappingProcessor:
+    @staticmethod
+    def process_file(
+        file_path: str,
+        file_type: str,
+        column_mapping: List[Dict[str, str]],
+        template: Dict[str, AttributeDefinition],
+        executor: Optional[Executor] = None,
+        chunksize: int = CHUNK_SIZE,
+    ) -> Tuple[str, int, ValidationResult]:
+        """
+        Transform and validate a seller file a chunk at a time, writing the
+        transformed rows to the store. Returns the stored rows' path, the row
+        count and the validation result.
+
+        With an executor, files of more than one chunk have their chunks
+        transformed and validated in parallel; results are still combined
+        in file order.
+        """
+        # The file is still parsed in one go: parsing it in chunks would infer
+        # each chunk's dtypes separately (e.g. sizes read as 32 in one chunk
+        # and 32.0 in another), giving different values than a whole read
+        df = FileParser.get_file_data(file_path, file_type)
+        frame, mappings = DataTransformer.select_columns(df, column_mapping)
+        del df
+
+        tasks = (
+            (
+                frame.iloc[start : start + chunksize],
+                mappings,
+                template,
+                column_mapping,
+                start,
+            )
+            for start in range(0, len(frame), chunksize)
+        )
+        if executor is not None and len(frame) > chunksize:
+            results = MappingProcessor._run_ordered(executor, tasks)
+        else:
+            results = starmap(MappingProcessor.process_chunk, tasks)
+
+        errors = []
+        truncated = False
+
+        def encoded_chunks() -> Iterator[bytes]:
+            nonlocal truncated
+            for encoded, chunk_errors, chunk_truncated in results:
+                # Each chunk reports up to MAX_ERRORS; keep the first overall
+                room = MAX_ERRORS - len(errors)
+                errors.extend(chunk_errors[:room])
+                truncated = truncated or chunk_truncated or len(chunk_errors) > room
+                yield encoded
+
+        transformed_data_path = TransformedDataStore.save_encoded(encoded_chunks())
+        # Models are only built for the errors that are reported
+        validation_result = ValidationResult(
+            is_valid=not errors and not truncated,
+            errors=[
+                ValidationError(field=field, message=message, row=row)
+                for field, message, row in errors
+            ],
+            truncated=truncated,
+        )
+        return transformed_data_path, len(frame), validation_result
+
+    @staticmethod
+    def process_chunk(
+        frame: pd.DataFrame,
+        mappings: Dict[str, Dict[str, str]],
+        template: Dict[str, AttributeDefinition],
+        column_mapping: List[Dict[str, str]],
+        row_offset: int,
+    ) -> Tuple[bytes, List[Tuple[str, str, int]], bool]:
+        """
+        Transform and validate one chunk, returning its rows already encoded
+        for the store, its errors as (field, message, row) tuples and whether
+        it had more errors than that. Runs in a worker process when chunks
+        are parallel, so only bytes and tuples come back.
+        """
+        chunk = DataTransformer.transform_columns(frame, mappings)
+        errors, truncated = DataValidator.find_errors(
+            chunk, template, column_mapping, row_offset=row_offset
+        )
+        encoded = TransformedDataStore.encode(DataTransformer.to_records(chunk))
+        return encoded, errors, truncated
+
+    @staticmethod
+    def _run_ordered(
+        executor: Executor, tasks: Iterable[_ChunkTask]
+    ) -> Iterator[Tuple[bytes, List[Tuple[str, str, int]], bool]]:
+        """Submit chunk tasks a window at a time and yield results in order"""
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(MappingProcessor.process_chunk, *task))
+            if len(pending) >= _CHUNKS_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
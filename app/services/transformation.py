@@ -1,6 +1,16 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from app.services.file_parser import FileParser
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import re
+
+# Rows transformed at a time when a file is processed in chunks
+CHUNK_SIZE = 50_000
+
+# Characters stripped from numeric attributes (currency symbols, commas, ...)
+_NON_NUMERIC_CHARS = re.compile(r"[^0-9.\-]")
 
 
 class DataTransformer:
@@ -12,12 +22,33 @@ class DataTransformer:
         Transform seller file data according to column mapping using vectorized
         pandas operations to handle large files efficiently.
         """
-        # Read and normalize file data
+        return DataTransformer.to_records(
+            DataTransformer.transform_frame(file_path, file_type, column_mapping)
+        )
+
+    @staticmethod
+    def transform_frame(
+        file_path: str, file_type: str, column_mapping: List[Dict[str, str]]
+    ) -> pd.DataFrame:
+        """
+        Like transform_data, but return the transformed DataFrame (one column
+        per marketplace attribute) so callers can validate it column-wise.
+        """
+        # Read file data (headers are already stripped by get_file_data)
         df = FileParser.get_file_data(file_path, file_type)
-        df.rename(
-            columns=lambda c: c.strip() if isinstance(c, str) else c, inplace=True
+        return DataTransformer.transform_columns(
+            *DataTransformer.select_columns(df, column_mapping)
         )
 
+    @staticmethod
+    def select_columns(
+        df: pd.DataFrame, column_mapping: List[Dict[str, str]]
+    ) -> Tuple[pd.DataFrame, Dict[str, Dict[str, str]]]:
+        """
+        Pick the mapped columns out of a seller file's DataFrame, named by
+        marketplace attribute, along with each attribute's mapping. Nothing
+        is transformed yet; see transform_columns.
+        """
         # Build mapping lookup keyed by normalized seller column name
         mapping_lookup = {
             (
@@ -28,131 +59,222 @@ class DataTransformer:
             for mapping in column_mapping
         }
 
-        transformed_df = pd.DataFrame(index=df.index)
+        # Position of each column by lowercased name, built once so matching
+        # is a dict lookup per mapping rather than a scan over every column.
+        # setdefault keeps the first column when two names collide.
+        lower_to_position = {}
+        for position, col in enumerate(df.columns):
+            if isinstance(col, str):
+                lower_to_position.setdefault(col.strip().lower(), position)
 
+        # Marketplace attribute -> (source column position, mapping). A later
+        # mapping to the same attribute replaces an earlier one but keeps its
+        # place in the output, as assigning the column twice would.
+        selected = {}
         for seller_col_norm, mapping in mapping_lookup.items():
-            marketplace_attr = mapping["marketplace_attribute"]
+            position = lower_to_position.get(seller_col_norm)
+            if position is not None:
+                selected[mapping["marketplace_attribute"]] = (position, mapping)
 
-            # Find the actual column name in df by case-insensitive match
-            matched_col = None
-            for col in df.columns:
-                if isinstance(col, str) and col.strip().lower() == seller_col_norm:
-                    matched_col = col
-                    break
+        # Select every mapped column in one step and rename to attributes
+        frame = df.iloc[:, [position for position, _ in selected.values()]]
+        frame.columns = list(selected)
+        return frame, {attr: mapping for attr, (_, mapping) in selected.items()}
 
-            if matched_col is None:
-                continue
+    @staticmethod
+    def transform_columns(
+        frame: pd.DataFrame, mappings: Dict[str, Dict[str, str]]
+    ) -> pd.DataFrame:
+        """
+        Apply each attribute's transformation and attribute specific handling
+        to columns picked by select_columns (or a slice of them)
+        """
+        transformed_df = frame.copy()
 
-            series = df[matched_col]
+        # Columns are read and written back by position, which skips the
+        # label lookup on every access
+        for i, (marketplace_attr, mapping) in enumerate(mappings.items()):
+            series = transformed_df.iloc[:, i]
 
             # Apply transformations
             transformation = mapping.get("transformation")
             if transformation == "uppercase":
-                series = series.fillna("").astype(str).str.upper().replace({"": None})
+                series = DataTransformer._transform_strings(series, "upper")
             elif transformation == "lowercase":
-                series = series.fillna("").astype(str).str.lower().replace({"": None})
+                series = DataTransformer._transform_strings(series, "lower")
             elif transformation == "strip":
-                series = series.fillna("").astype(str).str.strip().replace({"": None})
+                series = DataTransformer._transform_strings(series, "strip")
             elif transformation == "split_images":
-                series = (
-                    series.fillna("")
-                    .astype(str)
-                    .apply(
-                        lambda v: (
-                            [img.strip() for img in v.split(",") if img.strip()]
-                            if v
-                            else []
-                        )
-                    )
-                )
+                series = DataTransformer._split_series(series, ",")
 
             # Attribute specific handling
             if marketplace_attr == "images":
-                series = (
-                    series.fillna("")
-                    .astype(str)
-                    .apply(
-                        lambda v: (
-                            [img.strip() for img in v.split(",") if img.strip()]
-                            if v
-                            else []
-                        )
-                    )
-                )
+                series = DataTransformer._split_series(series, ",")
 
             if marketplace_attr == "bulletPoints":
-                series = (
-                    series.fillna("")
-                    .astype(str)
-                    .apply(
-                        lambda v: (
-                            [p.strip() for p in v.split("|") if p.strip()][:5]
-                            if v
-                            else []
-                        )
-                    )
-                )
+                series = DataTransformer._split_series(series, "|", limit=5)
 
             if marketplace_attr in ["mrp", "price", "listingPrice", "quantity"]:
-                cleaned = (
-                    series.fillna("")
-                    .astype(str)
-                    .str.replace(r"[^0-9.\-]", "", regex=True)
+                series = DataTransformer._cast_numbers(
+                    DataTransformer._parse_numbers(series)
                 )
-                numeric = pd.to_numeric(cleaned.replace({"": None}), errors="coerce")
 
-                def numeric_cast(x):
-                    if pd.isna(x):
-                        return None
-                    if float(x).is_integer():
-                        return int(x)
-                    return float(x)
+            transformed_df.isetitem(i, series)
 
-                series = numeric.apply(numeric_cast)
+        return transformed_df
 
-            transformed_df[marketplace_attr] = series
+    @staticmethod
+    def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Convert a transformed DataFrame to row dicts with missing values
+        (NaN, NaT, None) as None
+        """
+        # Work on one object array per column instead of copying the whole
+        # frame with .where() and letting to_dict box every cell again
+        columns = list(df.columns)
+        arrays = []
+        for col in columns:
+            values = df[col].to_numpy(dtype=object)
+            values[pd.isna(values)] = None
+            arrays.append(values)
+        return [dict(zip(columns, row)) for row in zip(*arrays)]
 
-        transformed_data = transformed_df.where(
-            pd.notnull(transformed_df), None
-        ).to_dict(orient="records")
-        return transformed_data
+    @staticmethod
+    def _transform_strings(series: pd.Series, method: str) -> pd.Series:
+        """
+        Apply a str method ("upper", "lower", "strip") to every value as
+        text, with missing or empty results as None.
+        """
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            # Numbers, dates and mixed values rely on pandas' astype(str)
+            # formatting, so they keep the plain pandas chain
+            return getattr(series.fillna("").astype(str).str, method)().replace(
+                {"": None}
+            )
+
+        # Text columns hold only str or missing values, so the fill, the
+        # string method and the empty -> None step fuse into a single pass
+        convert = getattr(str, method)
+
+        # Columns like brand, colour or size repeat a handful of values; when
+        # a sample suggests that, convert the distinct values only and spread
+        # the results back over the rows by their factorized codes. (This is
+        # also why non-text columns are excluded: factorize would merge
+        # values like 1 and True that print differently.)
+        head = series.head(1000)
+        if head.nunique() <= len(head) // 2:
+            codes, uniques = pd.factorize(series)
+            # The extra trailing None is what code -1 (a missing value) picks up
+            results = np.array(
+                [convert(value) or None for value in uniques] + [None], dtype=object
+            )
+            return pd.Series(results[codes], index=series.index, dtype=object)
+
+        values = series.to_numpy(dtype=object)
+        return pd.Series(
+            np.fromiter(
+                (
+                    (convert(value) or None) if isinstance(value, str) else None
+                    for value in values
+                ),
+                dtype=object,
+                count=len(values),
+            ),
+            index=series.index,
+            dtype=object,
+        )
 
     @staticmethod
-    def _apply_transformation(value: Any, transformation: str) -> Any:
-        """Fallback single-value transformation (kept for backward compatibility)."""
-        if transformation == "uppercase":
-            return str(value).upper() if value is not None else value
-        if transformation == "lowercase":
-            return str(value).lower() if value is not None else value
-        if transformation == "strip":
-            return str(value).strip() if value is not None else value
-        if transformation == "split_images":
-            if value and isinstance(value, str):
-                return [img.strip() for img in value.split(",") if img.strip()]
-            return value
-        return value
+    def _split_series(
+        series: pd.Series, sep: str, limit: Optional[int] = None
+    ) -> pd.Series:
+        """
+        Split each value on ``sep`` into a list of stripped, non-empty parts,
+        keeping at most ``limit`` parts. Missing values become empty lists.
+        """
+        # One comprehension over the object array is much cheaper than a
+        # pandas .apply, which adds a Python call per row. Missing values are
+        # found with one mask up front instead of filling and casting a copy
+        # of the column first.
+        values = series.to_numpy(dtype=object)
+        missing = pd.isna(values)
+        return pd.Series(
+            [
+                (
+                    []
+                    if is_missing
+                    else [
+                        part for part in map(str.strip, str(value).split(sep)) if part
+                    ][:limit]
+                )
+                for value, is_missing in zip(values.tolist(), missing.tolist())
+            ],
+            index=series.index,
+            dtype=object,
+        )
 
     @staticmethod
-    def _handle_special_cases(value: Any, marketplace_attr: str) -> Any:
-        """Fallback single-value handler (kept for compatibility)."""
-        if marketplace_attr == "images" and value:
-            if isinstance(value, str) and "," in value:
-                return [img.strip() for img in value.split(",") if img.strip()]
-            elif isinstance(value, str):
-                return [value]
-
-        if marketplace_attr == "bulletPoints" and value:
-            if isinstance(value, str):
-                points = [point.strip() for point in value.split("|") if point.strip()]
-                return points[:5]
-
-        if marketplace_attr in ["mrp", "price", "listingPrice", "quantity"] and value:
+    def _parse_numbers(series: pd.Series) -> pd.Series:
+        """
+        Parse values as numbers, ignoring currency symbols, thousands
+        separators and other non-numeric characters. Values that still
+        aren't numbers become NaN.
+        """
+        if pd.api.types.is_numeric_dtype(
+            series.dtype
+        ) and not pd.api.types.is_bool_dtype(series.dtype):
+            # Already parsed as numbers; nothing to clean
+            return series
+
+        if pd.api.types.infer_dtype(series, skipna=True) == "string":
+            # Prices like "Rs. 1,200" keep the column as text. Arrow's regex
+            # and cast kernels clean and parse it without a Python call per
+            # value; only a column with a leftover non-number (e.g. "1.2.3")
+            # needs pandas to coerce value by value
+            text = pa.array(
+                series.to_numpy(dtype=object), type=pa.string(), from_pandas=True
+            )
+            cleaned = pc.replace_substring_regex(text, _NON_NUMERIC_CHARS.pattern, "")
+            cleaned = pc.if_else(pc.equal(cleaned, ""), None, cleaned)
             try:
-                f = float(value)
-                if f.is_integer():
-                    return int(f)
-                return f
-            except (ValueError, TypeError):
-                return value
-
-        return value
+                numbers = pc.cast(cleaned, pa.float64()).to_numpy(
+                    zero_copy_only=False
+                )
+                # Whole numbers past 2**53 would be rounded as floats
+                if np.nanmax(np.abs(numbers), initial=0) >= 2**53:
+                    numbers = pc.cast(cleaned, pa.int64()).to_numpy(
+                        zero_copy_only=False
+                    )
+            except pa.ArrowInvalid:
+                return pd.to_numeric(
+                    pd.Series(cleaned.to_pylist(), index=series.index),
+                    errors="coerce",
+                )
+            return pd.Series(numbers, index=series.index)
+
+        cleaned = series.fillna("").astype(str)
+        # Most files have clean numbers, so only run the
+        # replacement when some value has other characters
+        if cleaned.str.contains(_NON_NUMERIC_CHARS).any():
+            cleaned = cleaned.str.replace(_NON_NUMERIC_CHARS, "", regex=True)
+        return pd.to_numeric(cleaned.replace({"": None}), errors="coerce")
+
+    @staticmethod
+    def _cast_numbers(numeric: pd.Series) -> pd.Series:
+        """
+        Convert a numeric series to Python ints for whole numbers, floats
+        otherwise, and None for missing values
+        """
+        if pd.api.types.is_integer_dtype(numeric.dtype):
+            return numeric.astype(object)
+
+        values = numeric.to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        # Whole numbers outside the int64 range stay floats
+        whole = present & (values % 1 == 0) & (np.abs(values) < 2**63)
+        fractional = present & ~whole
+
+        result = np.full(len(values), None, dtype=object)
+        result[whole] = values[whole].astype(np.int64)
+        result[fractional] = values[fractional]
+        return pd.Series(result, index=numeric.index, dtype=object)
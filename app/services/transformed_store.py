@@ -0,0 +1,66 @@
+from typing import List, Dict, Any, Iterable, Optional
+import os
+import uuid
+import orjson
+
+# Transformed rows can run to many MB per mapping, so they are written to disk
+# instead of a JSON column; listing mappings then never has to load them. The
+# database refers to these files by path, so in a container the directory has
+# to be on a volume (see docker-compose.yml) to outlive the container.
+TRANSFORMED_DIR = os.getenv("TRANSFORMED_DIR", "transformed")
+os.makedirs(TRANSFORMED_DIR, exist_ok=True)
+
+
+class TransformedDataStore:
+    @staticmethod
+    def encode(rows: List[Dict[str, Any]]) -> bytes:
+        """
+        Encode rows as a JSON array, the form save_encoded takes
+        """
+        return orjson.dumps(
+            rows, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+    @staticmethod
+    def save_encoded(chunks: Iterable[bytes]) -> str:
+        """
+        Write consecutive chunks of rows already encoded by encode() to a new
+        file as a single JSON array and return its path
+        """
+        file_path = os.path.join(TRANSFORMED_DIR, f"{uuid.uuid4().hex}.json")
+        try:
+            with open(file_path, "wb") as f:
+                f.write(b"[")
+                separator = b""
+                for encoded in chunks:
+                    if encoded == b"[]":
+                        continue
+                    # Each chunk is encoded as an array; dropping its brackets
+                    # lets the chunks join into one
+                    f.write(separator + encoded[1:-1])
+                    separator = b","
+                f.write(b"]")
+        except BaseException:
+            # Don't leave a partial file behind if producing a chunk failed
+            os.remove(file_path)
+            raise
+        return file_path
+
+    @staticmethod
+    def load(file_path: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Read transformed rows back; no path means no rows were stored. Raises
+        FileNotFoundError if the path is set but the file is gone.
+        """
+        if not file_path:
+            return []
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
+
+    @staticmethod
+    def delete(file_path: Optional[str]) -> None:
+        """
+        Remove a stored transformed-data file if it exists
+        """
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
@@ -1,25 +1,91 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Tuple, Union
 from app.schemas import (
     ValidationResult,
     ValidationError,
     AttributeDefinition,
     AttributeType,
 )
+from functools import lru_cache
+from itertools import repeat
+import numpy as np
+import pandas as pd
 import re
 
+# Compiled once at import rather than on every _is_valid_url call. Each domain
+# label is an atomic group: a label can't contain a dot, so it only ever
+# matches one way and there is nothing for the engine to backtrack into.
+_URL_PATTERN = re.compile(
+    r"^https?://"  # http:// or https://
+    r"(?:(?>[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain...
+    r"localhost|"  # localhost...
+    r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # ...or ip
+    r"(?::\d+)?"  # optional port
+    r"(?:/?|[/?]\S+)$",
+    re.IGNORECASE,
+)
+
+# Default cap on the errors reported for one validation
+MAX_ERRORS = 10_000
+
+# Rows (0-based indices) failing one check, with either a single message shared
+# by all of them or one message per row
+_Found = Tuple[np.ndarray, Union[str, List[str]]]
+
+# A reported error as (field, message, 1-based row)
+_Error = Tuple[str, str, int]
+
 
 class DataValidator:
     @staticmethod
     def validate_data(
-        data: List[Dict[str, Any]],
+        data: Union[List[Dict[str, Any]], pd.DataFrame],
         template: Dict[str, AttributeDefinition],
         column_mapping: List[Dict[str, str]],
+        max_errors: int = MAX_ERRORS,
+        row_offset: int = 0,
     ) -> ValidationResult:
         """
-        Validate transformed data against marketplace template
+        Validate transformed data (row dicts or a DataFrame) against a
+        marketplace template.
+
+        At most ``max_errors`` errors are returned, with ``truncated`` set
+        when there were more. ``row_offset`` is added to reported row
+        numbers, for data validated in chunks.
         """
-        errors = []
-        warnings = []
+        errors, truncated = DataValidator.find_errors(
+            data, template, column_mapping, max_errors, row_offset
+        )
+        return ValidationResult(
+            is_valid=not errors and not truncated,
+            errors=[
+                ValidationError(field=field, message=message, row=row)
+                for field, message, row in errors
+            ],
+            warnings=[],
+            truncated=truncated,
+        )
+
+    @staticmethod
+    def find_errors(
+        data: Union[List[Dict[str, Any]], pd.DataFrame],
+        template: Dict[str, AttributeDefinition],
+        column_mapping: List[Dict[str, str]],
+        max_errors: int = MAX_ERRORS,
+        row_offset: int = 0,
+    ) -> Tuple[List[_Error], bool]:
+        """
+        The checks behind validate_data, returning the errors as plain
+        (field, message, row) tuples, capped at ``max_errors``, and whether
+        there were more. No ValidationError models are built, so callers
+        that merge or discard errors (e.g. per chunk) can build models for
+        just the ones they report.
+
+        Each attribute is checked a whole column at a time; errors are
+        reported in the same row-by-row order as before.
+        """
+        # Templates may store plain dicts (from JSON); attributes that don't
+        # parse as AttributeDefinition are skipped
+        template = DataValidator.compile_template(template)
 
         # Create mapping dictionary for quick lookup
         mapping_dict = {
@@ -27,178 +93,284 @@ class DataValidator:
             for mapping in column_mapping
         }
 
-        for row_idx, row in enumerate(data):
-            for seller_col, marketplace_attr in mapping_dict.items():
-                if marketplace_attr in template:
-                    attr_def = template[marketplace_attr]
-                    # Normalize attr_def: templates may store plain dicts (from JSON)
-                    # or AttributeDefinition instances. Convert dict -> AttributeDefinition
-                    # so downstream code can use attributes like .required and .type.
-                    if isinstance(attr_def, dict):
-                        try:
-                            attr_def = AttributeDefinition(**attr_def)
-                        except Exception:
-                            # If conversion fails, skip validation for this attribute
-                            continue
-                    value = row.get(marketplace_attr)
-
-                    # Check required fields
-                    if attr_def.required and (value is None or value == ""):
-                        errors.append(
-                            ValidationError(
-                                field=marketplace_attr,
-                                message=f"Required field '{marketplace_attr}' is missing or empty",
-                                row=row_idx + 1,
-                            )
+        columns = {}
+
+        def column(attr: str) -> np.ndarray:
+            if attr not in columns:
+                columns[attr] = DataValidator._column_values(data, attr)
+            return columns[attr]
+
+        found_rows, found_keys, found_fields, found_messages = [], [], [], []
+
+        def record(found: List[_Found], field: str, key: int) -> None:
+            for rows, message in found:
+                if not len(rows):
+                    continue
+                found_rows.append(rows)
+                found_keys.append(np.full(len(rows), key))
+                found_fields.extend(repeat(field, len(rows)))
+                if isinstance(message, str):
+                    found_messages.extend(repeat(message, len(rows)))
+                else:
+                    found_messages.extend(message)
+
+        for position, marketplace_attr in enumerate(mapping_dict.values()):
+            attr_def = template.get(marketplace_attr)
+            if attr_def is None:
+                continue
+
+            values = column(marketplace_attr)
+            # NaN/NaT count as missing, as they become None in the stored rows
+            missing = pd.isna(values) | (values == "")
+
+            # Check required fields
+            if attr_def.required:
+                record(
+                    [
+                        (
+                            np.flatnonzero(missing),
+                            f"Required field '{marketplace_attr}' is missing or empty",
                         )
-                        continue
+                    ],
+                    marketplace_attr,
+                    3 * position,
+                )
 
-                    # Skip validation if value is empty and field is not required
-                    if value is None or value == "":
-                        continue
+            # Everything else only looks at non-empty values
+            rows = np.flatnonzero(~missing)
+            present = values[rows]
 
-                    # Type-specific validation
-                    validation_error = DataValidator._validate_field_type(
-                        value, attr_def, marketplace_attr, row_idx + 1
-                    )
-                    if validation_error:
-                        errors.append(validation_error)
+            # Type-specific validation
+            record(
+                DataValidator._type_errors(present, rows, attr_def, marketplace_attr),
+                marketplace_attr,
+                3 * position + 1,
+            )
 
-                    # Additional business rules validation
-                    business_error = DataValidator._validate_business_rules(
-                        value, marketplace_attr, row, row_idx + 1
-                    )
-                    if business_error:
-                        errors.append(business_error)
+            # Additional business rules validation
+            record(
+                DataValidator._business_errors(
+                    present, rows, marketplace_attr, data, column
+                ),
+                marketplace_attr,
+                3 * position + 2,
+            )
 
-        return ValidationResult(
-            is_valid=len(errors) == 0, errors=errors, warnings=warnings
+        if not found_rows:
+            return [], False
+
+        all_rows = np.concatenate(found_rows)
+        # Row first, then mapping order, then required/type/business
+        order = np.lexsort((np.concatenate(found_keys), all_rows))
+        truncated = len(order) > max_errors
+        order = order[:max_errors]
+        rows = (all_rows[order] + row_offset + 1).tolist()
+        return [
+            (found_fields[i], found_messages[i], row)
+            for i, row in zip(order.tolist(), rows)
+        ], truncated
+
+    @staticmethod
+    def compile_template(template: Dict[str, Any]) -> Dict[str, AttributeDefinition]:
+        """
+        Normalize a stored template into AttributeDefinition instances.
+        Attributes whose definition can't be parsed are dropped, which
+        matches validate_data skipping them.
+        """
+        # Already compiled (e.g. by the mapping router's per-template cache)
+        if all(
+            isinstance(attr_def, AttributeDefinition) for attr_def in template.values()
+        ):
+            return template
+
+        compiled = {}
+        for attr_name, attr_def in template.items():
+            if isinstance(attr_def, dict):
+                try:
+                    attr_def = AttributeDefinition(**attr_def)
+                except Exception:
+                    continue
+            compiled[attr_name] = attr_def
+        return compiled
+
+    @staticmethod
+    def _column_values(
+        data: Union[List[Dict[str, Any]], pd.DataFrame], attr: str
+    ) -> np.ndarray:
+        """An attribute's values as an object array, None where a row lacks it"""
+        if isinstance(data, pd.DataFrame):
+            if attr in data.columns:
+                return data[attr].to_numpy(dtype=object)
+            return np.full(len(data), None, dtype=object)
+        # fromiter keeps list values (images, bullet points) as single items
+        return np.fromiter(
+            (row.get(attr) for row in data), dtype=object, count=len(data)
         )
 
     @staticmethod
-    def _validate_field_type(
-        value: Any, attr_def: AttributeDefinition, field_name: str, row: int
-    ) -> Optional[ValidationError]:
-        """Validate field type and constraints"""
+    def _has_column(
+        data: Union[List[Dict[str, Any]], pd.DataFrame], attr: str
+    ) -> np.ndarray:
+        """Mask of the rows that carry ``attr`` at all (even if it is None)"""
+        if isinstance(data, pd.DataFrame):
+            return np.full(len(data), attr in data.columns)
+        return np.fromiter((attr in row for row in data), dtype=bool, count=len(data))
 
-        if attr_def.type == AttributeType.STRING:
-            if not isinstance(value, str):
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be a string",
-                    row=row,
-                )
+    @staticmethod
+    def _type_errors(
+        values: np.ndarray, rows: np.ndarray, attr_def: AttributeDefinition, field: str
+    ) -> List[_Found]:
+        """Validate field type and constraints for the non-empty values"""
 
-            if attr_def.max_length and len(value) > attr_def.max_length:
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' exceeds maximum length of {attr_def.max_length}",
-                    row=row,
-                )
+        if attr_def.type == AttributeType.STRING:
+            is_str = DataValidator._isinstance_mask(values, str)
+            found = [(rows[~is_str], f"Field '{field}' must be a string")]
 
-        elif attr_def.type == AttributeType.NUMBER:
-            try:
-                num_value = float(value)
-                if attr_def.min_value is not None and num_value < attr_def.min_value:
-                    return ValidationError(
-                        field=field_name,
-                        message=f"Field '{field_name}' must be >= {attr_def.min_value}",
-                        row=row,
+            if attr_def.max_length:
+                strings = values[is_str]
+                lengths = np.fromiter(map(len, strings), dtype=int, count=len(strings))
+                found.append(
+                    (
+                        rows[is_str][lengths > attr_def.max_length],
+                        f"Field '{field}' exceeds maximum length of {attr_def.max_length}",
                     )
-                if attr_def.max_value is not None and num_value > attr_def.max_value:
-                    return ValidationError(
-                        field=field_name,
-                        message=f"Field '{field_name}' must be <= {attr_def.max_value}",
-                        row=row,
-                    )
-            except (ValueError, TypeError):
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be a valid number",
-                    row=row,
                 )
+            return found
 
-        elif attr_def.type == AttributeType.INTEGER:
-            try:
-                int_value = int(value)
-                if attr_def.min_value is not None and int_value < attr_def.min_value:
-                    return ValidationError(
-                        field=field_name,
-                        message=f"Field '{field_name}' must be >= {attr_def.min_value}",
-                        row=row,
-                    )
-                if attr_def.max_value is not None and int_value > attr_def.max_value:
-                    return ValidationError(
-                        field=field_name,
-                        message=f"Field '{field_name}' must be <= {attr_def.max_value}",
-                        row=row,
-                    )
-            except (ValueError, TypeError):
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be a valid integer",
-                    row=row,
-                )
+        if attr_def.type == AttributeType.NUMBER:
+            numbers, ok = DataValidator._to_floats(values)
+            return [
+                (rows[~ok], f"Field '{field}' must be a valid number"),
+                *DataValidator._range_errors(numbers[ok], rows[ok], attr_def, field),
+            ]
 
-        elif attr_def.type == AttributeType.ENUM:
-            if attr_def.enum_values and value not in attr_def.enum_values:
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be one of: {', '.join(attr_def.enum_values)}",
-                    row=row,
-                )
+        if attr_def.type == AttributeType.INTEGER:
+            numbers, ok = DataValidator._to_ints(values)
+            return [
+                (rows[~ok], f"Field '{field}' must be a valid integer"),
+                *DataValidator._range_errors(numbers[ok], rows[ok], attr_def, field),
+            ]
 
-        elif attr_def.type == AttributeType.ARRAY:
-            if not isinstance(value, list):
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be an array",
-                    row=row,
+        if attr_def.type == AttributeType.ENUM:
+            if not attr_def.enum_values:
+                return []
+            allowed = pd.Series(values, dtype=object).isin(attr_def.enum_values)
+            return [
+                (
+                    rows[~allowed.to_numpy()],
+                    f"Field '{field}' must be one of: {', '.join(attr_def.enum_values)}",
                 )
+            ]
 
-        return None
+        if attr_def.type == AttributeType.ARRAY:
+            is_list = DataValidator._isinstance_mask(values, list)
+            return [(rows[~is_list], f"Field '{field}' must be an array")]
+
+        return []
 
     @staticmethod
-    def _validate_business_rules(
-        value: Any, field_name: str, row: Dict[str, Any], row_num: int
-    ) -> Optional[ValidationError]:
-        """Validate business-specific rules"""
+    def _range_errors(
+        numbers: np.ndarray, rows: np.ndarray, attr_def: AttributeDefinition, field: str
+    ) -> List[_Found]:
+        """min_value/max_value checks; a value below the minimum isn't also
+        reported against the maximum"""
+        too_small = np.zeros(len(numbers), dtype=bool)
+        found = []
+        if attr_def.min_value is not None:
+            too_small = (numbers < attr_def.min_value).astype(bool)
+            found.append(
+                (rows[too_small], f"Field '{field}' must be >= {attr_def.min_value}")
+            )
+        if attr_def.max_value is not None:
+            too_large = ~too_small & (numbers > attr_def.max_value).astype(bool)
+            found.append(
+                (rows[too_large], f"Field '{field}' must be <= {attr_def.max_value}")
+            )
+        return found
 
-        # Price <= MRP validation
-        if field_name == "price" and "mrp" in row:
+    @staticmethod
+    def _business_errors(
+        values: np.ndarray,
+        rows: np.ndarray,
+        field: str,
+        data: Union[List[Dict[str, Any]], pd.DataFrame],
+        column,
+    ) -> List[_Found]:
+        """Validate business-specific rules for the non-empty values"""
+        found = []
+
+        # Price <= MRP validation, for rows that have an mrp
+        if field == "price":
+            with_mrp = DataValidator._has_column(data, "mrp")[rows]
+            prices, price_ok = DataValidator._to_floats(values)
+            mrps, mrp_ok = DataValidator._to_floats(column("mrp")[rows])
+            over = with_mrp & price_ok & mrp_ok
+            over[over] = prices[over] > mrps[over]
+            found.append(
+                (
+                    rows[over],
+                    [
+                        f"Price ({float(price)}) cannot be greater than MRP ({float(mrp)})"
+                        for price, mrp in zip(prices[over], mrps[over])
+                    ],
+                )
+            )
+
+        # URL validation for image fields
+        if field.startswith("image"):
+            truthy = np.fromiter(map(bool, values), dtype=bool, count=len(values))
+            invalid = np.fromiter(
+                (
+                    not DataValidator._is_valid_url(str(value))
+                    for value in values[truthy]
+                ),
+                dtype=bool,
+                count=int(truthy.sum()),
+            )
+            found.append(
+                (rows[truthy][invalid], f"Field '{field}' must be a valid URL")
+            )
+
+        return found
+
+    @staticmethod
+    def _to_floats(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """float() of each value, plus a mask of the values that converted"""
+        try:
+            # Casting an object array calls float() on each element in C
+            return values.astype(float), np.ones(len(values), dtype=bool)
+        except (ValueError, TypeError):
+            pass
+        numbers = np.full(len(values), np.nan)
+        ok = np.ones(len(values), dtype=bool)
+        for i, value in enumerate(values):
             try:
-                price = float(value)
-                mrp = float(row.get("mrp", 0))
-                if price > mrp:
-                    return ValidationError(
-                        field=field_name,
-                        message=f"Price ({price}) cannot be greater than MRP ({mrp})",
-                        row=row_num,
-                    )
+                numbers[i] = float(value)
             except (ValueError, TypeError):
-                pass
+                ok[i] = False
+        return numbers, ok
 
-        # URL validation for image fields
-        if field_name.startswith("image") and value:
-            if not DataValidator._is_valid_url(str(value)):
-                return ValidationError(
-                    field=field_name,
-                    message=f"Field '{field_name}' must be a valid URL",
-                    row=row_num,
-                )
+    @staticmethod
+    def _to_ints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """int() of each value (kept as Python ints), plus a mask of the
+        values that converted"""
+        numbers = np.full(len(values), None, dtype=object)
+        ok = np.ones(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                numbers[i] = int(value)
+            except (ValueError, TypeError):
+                ok[i] = False
+        return numbers, ok
 
-        return None
+    @staticmethod
+    def _isinstance_mask(values: np.ndarray, cls: type) -> np.ndarray:
+        return np.fromiter(
+            map(isinstance, values, repeat(cls)), dtype=bool, count=len(values)
+        )
 
     @staticmethod
+    @lru_cache(maxsize=131072)
     def _is_valid_url(url: str) -> bool:
-        """Simple URL validation"""
-        url_pattern = re.compile(
-            r"^https?://"  # http:// or https://
-            r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain...
-            r"localhost|"  # localhost...
-            r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # ...or ip
-            r"(?::\d+)?"  # optional port
-            r"(?:/?|[/?]\S+)$",
-            re.IGNORECASE,
-        )
-        return url_pattern.match(url) is not None
+        """Simple URL validation, cached since catalogs repeat image URLs"""
+        return _URL_PATTERN.match(url) is not None
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import multiprocessing
+import os
+import threading
+
+# Parsing and transforming seller files is CPU bound and pandas holds the GIL
+# for much of it, so that work runs in worker processes to use every core.
+# One pool is shared by every caller and created on first use, so importing
+# doesn't start processes; "spawn" avoids forking a server that already runs
+# threads. Callers run on threadpool threads as well as the event loop, so
+# creating and replacing the pool goes through a lock.
+#
+# Each server process starts its own pool, so by default the cores are
+# shared out between the WEB_CONCURRENCY server processes (gunicorn's -w)
+# rather than every one of them starting a worker per core. WORKER_POOL_SIZE
+# sets the number of worker processes per server process directly.
+POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared worker pool, starting it if needed"""
+    global _POOL
+    pool = _POOL
+    if pool is None:
+        with _POOL_LOCK:
+            # Another thread may have started it while this one waited
+            if _POOL is None:
+                _POOL = ProcessPoolExecutor(
+                    max_workers=POOL_SIZE,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            pool = _POOL
+    return pool
+
+
+def shutdown_pool(pool: Optional[ProcessPoolExecutor] = None):
+    """Stop the worker processes (called on application shutdown, or to
+    replace a pool whose worker died). Given a pool, it is only stopped if it
+    is still the shared one, so requests that all saw the same broken pool
+    don't stop the replacement one of them already started."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or (pool is not None and pool is not _POOL):
+            return
+        pool, _POOL = _POOL, None
+    # Outside the lock: get_pool can start a new pool while this one winds down
+    pool.shutdown()
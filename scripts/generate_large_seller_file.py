@@ -2,52 +2,52 @@
 """Generate a large seller CSV for testing.
 Usage: python scripts/generate_large_seller_file.py --rows 10000 --out /tmp/large.csv
 """
-import csv
 import argparse
-from random import randint, choice, uniform
-from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 
 SIZES = ["XS", "S", "M", "L", "XL", "XXL", "32", "34", "36"]
 BRANDS = ["BrandA", "BrandB", "BrandC", "BrandD"]
 TITLES = ["T-Shirt", "Shirt", "Jeans", "Dress", "Saree", "Shoes", "Bag"]
 COLORS = ["Red", "Blue", "Green", "Black", "White"]
+GENDERS = ["Men", "Women", "Boys", "Girls", "Unisex"]
+MATERIALS = ["Cotton", "Polyester", "Silk", "Denim"]
 
 
-def generate_row(i):
-    sku = f"SKU{i:08d}"
-    title = f"{choice(TITLES)} {i}"
-    brand = choice(BRANDS)
-    gender = choice(["Men", "Women", "Boys", "Girls", "Unisex"])
-    category = "T-Shirts"
-    color = choice(COLORS)
-    size = choice(SIZES)
-    mrp = round(uniform(10.0, 200.0), 2)
+def generate_rows(rows, rng):
+    """Build every column at once with numpy instead of one row at a time"""
+    ids = np.arange(1, rows + 1)
+    id_text = ids.astype(str)
+    sku = np.char.add("SKU", np.char.zfill(id_text, 8))
+    image_prefix = np.char.add("https://example.com/images/", sku)
+
+    mrp = rng.uniform(10.0, 200.0, rows).round(2)
+    price = rng.uniform(0.5 * mrp, mrp).round(2)
     # Introduce some invalid rows where price > mrp to test validation
-    if i % 1000 == 0:
-        price = round(mrp + uniform(1.0, 50.0), 2)
-    else:
-        price = round(uniform(0.5 * mrp, mrp), 2)
-    material = choice(["Cotton", "Polyester", "Silk", "Denim"])
-    image1 = f"https://example.com/images/{sku}_1.jpg"
-    image2 = f"https://example.com/images/{sku}_2.jpg"
-    quantity = randint(0, 100)
-    description = f"Auto generated product {i}"
-    return [
-        sku,
-        title,
-        brand,
-        gender,
-        category,
-        color,
-        size,
-        mrp,
-        price,
-        material,
-        image1,
-        image2,
-        quantity,
-        description,
-    ]
+    invalid = ids % 1000 == 0
+    price[invalid] = (mrp[invalid] + rng.uniform(1.0, 50.0, invalid.sum())).round(2)
+
+    return pa.table(
+        {
+            "SKU": sku,
+            "Name": np.char.add(
+                np.char.add(rng.choice(TITLES, rows), " "), id_text
+            ),
+            "BrandName": rng.choice(BRANDS, rows),
+            "Gender": rng.choice(GENDERS, rows),
+            "Category": np.full(rows, "T-Shirts"),
+            "Color": rng.choice(COLORS, rows),
+            "Size": rng.choice(SIZES, rows),
+            "MRP": mrp,
+            "Price": price,
+            "Material": rng.choice(MATERIALS, rows),
+            "Image1": np.char.add(image_prefix, "_1.jpg"),
+            "Image2": np.char.add(image_prefix, "_2.jpg"),
+            "Quantity": rng.integers(0, 100, rows, endpoint=True),
+            "Description": np.char.add("Auto generated product ", id_text),
+        }
+    )
 
 
 def main():
@@ -56,30 +56,14 @@ def main():
     parser.add_argument(
         "--out", type=str, default="tests/fixtures/large_seller_file.csv"
     )
+    parser.add_argument("--seed", type=int, default=None)
     args = parser.parse_args()
+    if args.rows < 1:
+        parser.error("--rows must be at least 1")
 
-    headers = [
-        "SKU",
-        "Name",
-        "BrandName",
-        "Gender",
-        "Category",
-        "Color",
-        "Size",
-        "MRP",
-        "Price",
-        "Material",
-        "Image1",
-        "Image2",
-        "Quantity",
-        "Description",
-    ]
-
-    with open(args.out, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for i in range(1, args.rows + 1):
-            writer.writerow(generate_row(i))
+    table = generate_rows(args.rows, np.random.default_rng(args.seed))
+    # Arrow's CSV writer is several times faster than csv.writer or to_csv
+    pa_csv.write_csv(table, args.out)
     print(f"Wrote {args.rows} rows to {args.out}")
 
 
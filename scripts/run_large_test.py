@@ -6,10 +6,15 @@ import argparse
 import time
 import requests
 import os
+import uuid
 from subprocess import check_call
 
 BASE_URL = os.environ.get("APP_URL", "http://localhost:8000")
 
+# One session for every request, so the connection to the API is kept alive
+# and reused instead of being reopened for each call
+SESSION = requests.Session()
+
 
 def generate(rows, out):
     check_call(
@@ -24,11 +29,30 @@ def generate(rows, out):
     )
 
 
+def multipart_body(file_path, boundary, chunk_size=1 << 20):
+    """Yield a multipart/form-data body for the file a chunk at a time"""
+    filename = os.path.basename(file_path)
+    yield (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "\r\n"
+    ).encode()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
 def upload(file_path):
     url = f"{BASE_URL}/api/seller-file/upload"
-    with open(file_path, "rb") as f:
-        files = {"file": (os.path.basename(file_path), f)}
-        r = requests.post(url, files=files)
+    # requests builds files= bodies in memory; a generator is sent with
+    # chunked encoding, so memory use doesn't grow with the file size
+    boundary = uuid.uuid4().hex
+    r = SESSION.post(
+        url,
+        data=multipart_body(file_path, boundary),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
     r.raise_for_status()
     return r.json()
 
@@ -45,7 +69,7 @@ def create_mapping(template_id, seller_file_id):
             {"seller_column": "BrandName", "marketplace_attribute": "brand"},
         ],
     }
-    r = requests.post(url, json=payload)
+    r = SESSION.post(url, json=payload)
     r.raise_for_status()
     return r.json()
 
@@ -79,7 +103,7 @@ def main():
     print(f"Mapping created in {t1 - t0:.2f}s; mapping id={mapping.get('id')}")
     print("Summary:")
     print(f"Rows: {args.rows}")
-    print(f"Transformed rows: {len(mapping.get('transformed_data') or [])}")
+    print(f"Transformed rows: {mapping.get('row_count')}")
     print(f"Validation is_valid: {mapping.get('is_valid')}")
 
 
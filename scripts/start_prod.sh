@@ -26,11 +26,16 @@ mkdir -p uploads
 export DATABASE_URL="${DATABASE_URL:-sqlite:///./product_listing.db}"
 export DEBUG="False"
 
+# Server processes (gunicorn reads WEB_CONCURRENCY too). Each one starts its
+# own pool of file parsing/transforming workers, sized cpu_count /
+# WEB_CONCURRENCY unless WORKER_POOL_SIZE sets it per server process.
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-4}"
+
 # Start the application with Gunicorn
 echo "🌟 Starting FastAPI application with Gunicorn..."
 echo "📍 API will be available at: http://localhost:8000"
 echo "📚 Swagger UI will be available at: http://localhost:8000/docs"
 echo ""
 
-gunicorn app.main:app -w 4 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --access-logfile - --error-logfile -
+gunicorn app.main:app -w "$WEB_CONCURRENCY" -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --access-logfile - --error-logfile -
 
@@ -0,0 +1,206 @@
+import io
+import os
+import pytest
+
+# SQLAlchemy, pandas and the app are imported inside the fixtures rather than
+# at module import time, to avoid import-time errors on Python versions where
+# typing internals differ (e.g., Python 3.13) and so only the tests that use a
+# fixture pay for its imports. The fixtures are session-scoped so the engine,
+# tables, app and TestClient are built once for the whole run.
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """In-memory SQLite engine shared by every test"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.pool import StaticPool
+
+    # StaticPool gives every session the one connection (each new connection
+    # to sqlite:// would open its own empty database)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite starts transactions lazily and doesn't support SAVEPOINT inside
+    # them; let SQLAlchemy emit BEGIN itself so each test's transaction (and
+    # the savepoints the app's commits become) can be rolled back
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def tables(engine):
+    """Create the tables once and drop them at the end of the run"""
+    from app.models import Base
+
+    # One transaction for all the DDL rather than one per statement
+    with engine.begin() as connection:
+        Base.metadata.create_all(bind=connection)
+    yield
+    with engine.begin() as connection:
+        Base.metadata.drop_all(bind=connection)
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine, tables):
+    """
+    Sessions handed to the app. They join the current test's transaction
+    (see db_transaction), so their commits only release a savepoint.
+    """
+    from sqlalchemy.orm import sessionmaker
+
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=engine,
+        join_transaction_mode="create_savepoint",
+    )
+
+
+@pytest.fixture(scope="session")
+def storage_dirs(tmp_path_factory):
+    """
+    Point uploads and transformed rows at temporary directories: rolling back
+    the database doesn't remove the files requests write
+    """
+    from app.routers import seller_file
+    from app.services import transformed_store
+
+    upload_dir = tmp_path_factory.mktemp("uploads")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(seller_file, "UPLOAD_DIR", str(upload_dir))
+        mp.setattr(seller_file, "_UPLOAD_PREFIX", str(upload_dir) + os.sep)
+        mp.setattr(
+            transformed_store,
+            "TRANSFORMED_DIR",
+            str(tmp_path_factory.mktemp("transformed")),
+        )
+        yield
+
+
+@pytest.fixture(scope="session")
+def app(session_factory, storage_dirs):
+    """The app, with get_db handing out sessions on the test database"""
+    from app.main import app
+
+    app.state.SessionLocal = session_factory
+    yield app
+    del app.state.SessionLocal
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    import anyio.from_thread
+    from fastapi.testclient import TestClient
+
+    # Not entered as a context manager: the startup handler would create
+    # tables in the real database. Without that, TestClient starts a new
+    # event loop thread (blocking portal) for every request; give it one to
+    # reuse for the whole run instead.
+    client = TestClient(app)
+    with anyio.from_thread.start_blocking_portal() as portal:
+        client.portal = portal
+        yield client
+        client.portal = None
+    client.close()
+
+
+@pytest.fixture
+def db_transaction(engine, session_factory):
+    """Run a test inside a transaction and roll back everything it wrote"""
+    from app.routers import mapping
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    session_factory.configure(bind=connection)
+    try:
+        yield connection
+    finally:
+        session_factory.configure(bind=engine)
+        transaction.rollback()
+        connection.close()
+        # The rollback frees the test's template ids for the next test, which
+        # can create its templates within the same second
+        mapping._COMPILED_TEMPLATES.clear()
+
+
+# Template for the sample CSV's Name and Price columns
+_MAPPING_TEMPLATE = {
+    "name": "Test Template",
+    "description": "Test template",
+    "template": {
+        "productName": {
+            "name": "productName",
+            "type": "string",
+            "required": True,
+        },
+        "price": {"name": "price", "type": "number", "required": True},
+    },
+}
+
+
+@pytest.fixture(scope="session")
+def sample_csv_bytes():
+    """A one-row seller CSV, posted straight from memory"""
+    return b"SKU,Name,Price\nSKU001,Test Product,100"
+
+
+@pytest.fixture
+def built_mapping(client, db_transaction, sample_csv_bytes):
+    """
+    Create a template, upload sample_csv_bytes and map its Name and Price
+    columns onto it; returns (template_id, file_id, mapping_id)
+    """
+    template_response = client.post(
+        "/api/marketplace/templates", json=_MAPPING_TEMPLATE
+    )
+    file_response = client.post(
+        "/api/seller-file/upload",
+        files={"file": ("test.csv", sample_csv_bytes, "text/csv")},
+    )
+    assert template_response.status_code == 200
+    assert file_response.status_code == 200
+    template_id = template_response.json()["id"]
+    file_id = file_response.json()["id"]
+
+    mapping_data = {
+        "name": "Test Mapping",
+        "marketplace_template_id": template_id,
+        "seller_file_id": file_id,
+        "column_mapping": [
+            {"seller_column": "Name", "marketplace_attribute": "productName"},
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+        ],
+    }
+    mapping_response = client.post("/api/mapping/", json=mapping_data)
+    assert mapping_response.status_code == 200
+
+    return template_id, file_id, mapping_response.json()["id"]
+
+
+@pytest.fixture
+def patch_get_file_data(monkeypatch):
+    """
+    Make FileParser.get_file_data read CSV content given in place of the file
+    path, so transformer tests don't write temp files
+    """
+    import pandas as pd
+    from app.services.file_parser import FileParser
+
+    def get_file_data(csv_content: str, file_type: str) -> pd.DataFrame:
+        df = pd.read_csv(io.StringIO(csv_content))
+        df.columns = df.columns.str.strip()
+        return df
+
+    monkeypatch.setattr(FileParser, "get_file_data", staticmethod(get_file_data))
@@ -1,149 +1,68 @@
-from fastapi.testclient import TestClient
-from app.models import Base
-import tempfile
 import os
-
-# Defer SQLAlchemy imports and engine creation to setup_module to avoid import-time
-# errors on Python versions where typing internals differ (e.g., Python 3.13)
-engine = None
-TestingSessionLocal = None
-_orig_get_db = None
-
-
-def setup_module(module):
-    """Create test engine, session factory and override app dependency."""
-    global engine, TestingSessionLocal, app, client, _orig_get_db
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-
-    SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-    # import get_db here to avoid importing app.database at module import time
-    # (which would import SQLAlchemy immediately and can fail under some
-    # Python versions). Save a reference so teardown can remove the override.
-    from app.database import get_db as _get_db
-
-    # _orig_get_db is declared global above; assign to it below
-    def override_get_db():
-        try:
-            db = TestingSessionLocal()
-            yield db
-        finally:
-            db.close()
-
-    _orig_get_db = _get_db
-
-    # Create test database tables
-    Base.metadata.create_all(bind=engine)
-
-    # Import the app AFTER the test DB is prepared so that app import
-    # (and any SQLAlchemy imports) occur after tests have configured the
-    # test engine.
-    from app.main import app as _app
-
-    app = _app
-
-    # Now that `app` is available, set the dependency override and create
-    # the TestClient.
-    app.dependency_overrides[_orig_get_db] = override_get_db
-
-    client = TestClient(app)
-
-
-def teardown_module(module):
-    """Drop test tables and remove test DB file."""
-    global engine
-    try:
-        if engine is not None:
-            Base.metadata.drop_all(bind=engine)
-    except Exception:
-        pass
-    try:
-        if os.path.exists("test.db"):
-            os.unlink("test.db")
-    except Exception:
-        pass
-    try:
-        if "client" in globals() and client is not None:
-            client.close()
-    except Exception:
-        pass
-    # Remove dependency override
-    try:
-        if _orig_get_db is not None:
-            app.dependency_overrides.pop(_orig_get_db, None)
-    except Exception:
-        pass
+import pytest
+
+# Request bodies shared by the tests; each test's writes are rolled back, so
+# the same names can be created again in every test
+_MYNTRA_TEMPLATE = {
+    "name": "Myntra Template",
+    "description": "Template for Myntra marketplace",
+    "template": {
+        "productName": {
+            "name": "productName",
+            "type": "string",
+            "required": True,
+            "max_length": 150,
+        },
+        "price": {
+            "name": "price",
+            "type": "number",
+            "required": True,
+            "min_value": 0,
+        },
+    },
+}
+
+_NAME_TEMPLATE = {
+    "name": "Test Template",
+    "description": "Test template",
+    "template": {
+        "productName": {
+            "name": "productName",
+            "type": "string",
+            "required": True,
+        }
+    },
+}
 
 
+@pytest.mark.usefixtures("db_transaction")
 class TestAPI:
 
-    def setup_method(self):
-        """Setup test database"""
-        # Clear existing data
-        Base.metadata.drop_all(bind=engine)
-        Base.metadata.create_all(bind=engine)
-
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint"""
         response = client.get("/")
         assert response.status_code == 200
         assert response.json()["message"] == "Product Listing System API"
 
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test health check endpoint"""
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json()["status"] == "healthy"
 
-    def test_create_marketplace_template(self):
+    def test_create_marketplace_template(self, client):
         """Test creating marketplace template"""
-        template_data = {
-            "name": "Myntra Template",
-            "description": "Template for Myntra marketplace",
-            "template": {
-                "productName": {
-                    "name": "productName",
-                    "type": "string",
-                    "required": True,
-                    "max_length": 150,
-                },
-                "price": {
-                    "name": "price",
-                    "type": "number",
-                    "required": True,
-                    "min_value": 0,
-                },
-            },
-        }
-
-        response = client.post("/api/marketplace/templates", json=template_data)
+        response = client.post("/api/marketplace/templates", json=_MYNTRA_TEMPLATE)
         assert response.status_code == 200
 
         data = response.json()
         assert data["name"] == "Myntra Template"
         assert data["template"]["productName"]["required"]
 
-    def test_get_marketplace_templates(self):
+    def test_get_marketplace_templates(self, client):
         """Test getting marketplace templates"""
         # First create a template
-        template_data = {
-            "name": "Test Template",
-            "description": "Test template",
-            "template": {
-                "productName": {
-                    "name": "productName",
-                    "type": "string",
-                    "required": True,
-                }
-            },
-        }
-
-        client.post("/api/marketplace/templates", json=template_data)
+        client.post("/api/marketplace/templates", json=_NAME_TEMPLATE)
 
         # Then get all templates
         response = client.get("/api/marketplace/templates")
@@ -153,159 +72,223 @@ class TestAPI:
         assert len(data) == 1
         assert data[0]["name"] == "Test Template"
 
-    def test_upload_seller_file(self):
+    def test_upload_seller_file(self, client, sample_csv_bytes):
         """Test uploading seller file"""
-        # Create a test CSV file
-        csv_content = "SKU,Name,Price\nSKU001,Test Product,100"
-
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            with open(temp_file_path, "rb") as f:
-                response = client.post(
-                    "/api/seller-file/upload",
-                    files={"file": ("test.csv", f, "text/csv")},
-                )
+        response = client.post(
+            "/api/seller-file/upload",
+            files={"file": ("test.csv", sample_csv_bytes, "text/csv")},
+        )
 
-            assert response.status_code == 200
+        assert response.status_code == 200
 
-            data = response.json()
-            assert data["original_filename"] == "test.csv"
-            assert "SKU" in data["columns"]
-            assert "Name" in data["columns"]
-            assert "Price" in data["columns"]
-            assert data["row_count"] == 1
+        data = response.json()
+        assert data["original_filename"] == "test.csv"
+        assert "SKU" in data["columns"]
+        assert "Name" in data["columns"]
+        assert "Price" in data["columns"]
+        assert data["row_count"] == 1
+
+    def test_upload_duplicate_seller_file(self, client, sample_csv_bytes):
+        """Test uploading identical content returns the existing file"""
+        first = client.post(
+            "/api/seller-file/upload",
+            files={"file": ("first.csv", sample_csv_bytes, "text/csv")},
+        )
+        second = client.post(
+            "/api/seller-file/upload",
+            files={"file": ("second.csv", sample_csv_bytes, "text/csv")},
+        )
 
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json()["id"] == first.json()["id"]
+        assert second.json()["original_filename"] == "first.csv"
+        assert len(client.get("/api/seller-file/files").json()) == 1
+
+    @pytest.mark.parametrize("failures,status_code", [(1, 200), (2, 503)])
+    def test_upload_worker_died(
+        self, client, sample_csv_bytes, monkeypatch, failures, status_code
+    ):
+        """Test an upload is retried once on a fresh pool when a worker dies"""
+        from concurrent.futures import ThreadPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        from app.routers import seller_file
+
+        calls = []
+
+        def parse_path(file_path, file_type):
+            calls.append(file_path)
+            if len(calls) <= failures:
+                raise BrokenProcessPool("worker died")
+            return ["SKU"], [], 1
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        monkeypatch.setattr(seller_file, "get_pool", lambda: executor)
+        monkeypatch.setattr(seller_file, "shutdown_pool", lambda pool: None)
+        monkeypatch.setattr(seller_file.FileParser, "parse_path", parse_path)
+        try:
+            response = client.post(
+                "/api/seller-file/upload",
+                files={"file": ("test.csv", sample_csv_bytes, "text/csv")},
+            )
         finally:
-            os.unlink(temp_file_path)
-
-    def test_create_mapping(self):
-        """Test creating a mapping"""
-        # First create marketplace template
-        template_data = {
-            "name": "Test Template",
-            "description": "Test template",
-            "template": {
-                "productName": {
-                    "name": "productName",
-                    "type": "string",
-                    "required": True,
-                },
-                "price": {"name": "price", "type": "number", "required": True},
-            },
-        }
-
-        template_response = client.post(
-            "/api/marketplace/templates", json=template_data
-        )
-        template_id = template_response.json()["id"]
+            executor.shutdown()
 
-        # Create seller file
-        csv_content = "SKU,Name,Price\nSKU001,Test Product,100"
+        assert response.status_code == status_code
+        assert len(calls) == 2
+        # A failed upload doesn't leave its file behind
+        assert os.path.exists(calls[0]) == (status_code == 200)
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
+    def test_create_mapping(self, client, built_mapping):
+        """Test creating a mapping"""
+        _, _, mapping_id = built_mapping
 
-        try:
-            with open(temp_file_path, "rb") as f:
-                file_response = client.post(
-                    "/api/seller-file/upload",
-                    files={"file": ("test.csv", f, "text/csv")},
-                )
+        response = client.get(f"/api/mapping/{mapping_id}")
+        assert response.status_code == 200
 
-            file_id = file_response.json()["id"]
+        data = response.json()
+        assert data["name"] == "Test Mapping"
+        assert data["is_valid"]
+
+    def test_update_mapping_after_template_edit(self, client, built_mapping):
+        """Test a mapping is validated against the template's latest version"""
+        template_id, file_id, mapping_id = built_mapping
+        mapping = client.get(f"/api/mapping/{mapping_id}").json()
+
+        template = client.get(f"/api/marketplace/templates/{template_id}").json()
+        template["template"]["price"]["max_value"] = 50
+        response = client.put(
+            f"/api/marketplace/templates/{template_id}", json=template
+        )
+        assert response.status_code == 200
 
-            # Create mapping
-            mapping_data = {
-                "name": "Test Mapping",
+        response = client.put(
+            f"/api/mapping/{mapping_id}",
+            json={
+                "name": mapping["name"],
                 "marketplace_template_id": template_id,
                 "seller_file_id": file_id,
-                "column_mapping": [
-                    {"seller_column": "Name", "marketplace_attribute": "productName"},
-                    {"seller_column": "Price", "marketplace_attribute": "price"},
-                ],
-            }
-
-            response = client.post("/api/mapping/", json=mapping_data)
-            assert response.status_code == 200
-
-            data = response.json()
-            assert data["name"] == "Test Mapping"
-            assert data["is_valid"]
-
-        finally:
-            os.unlink(temp_file_path)
+                "column_mapping": mapping["column_mapping"],
+            },
+        )
+        assert response.status_code == 200
+        # The sample row's price of 100 is over the new maximum
+        assert not response.json()["is_valid"]
 
-    def test_get_transformed_data(self):
+    def test_get_transformed_data(self, client, built_mapping):
         """Test getting transformed data"""
-        # Create template, file, and mapping first
-        template_data = {
-            "name": "Test Template",
-            "description": "Test template",
-            "template": {
-                "productName": {
-                    "name": "productName",
-                    "type": "string",
-                    "required": True,
-                },
-                "price": {"name": "price", "type": "number", "required": True},
-            },
-        }
+        _, _, mapping_id = built_mapping
+
+        response = client.get(f"/api/mapping/{mapping_id}/transformed-data")
+        assert response.status_code == 200
 
+        data = response.json()
+        assert data["mapping_id"] == mapping_id
+        assert data["total_rows"] == 1
+        assert data["valid_rows"] == 1
+        assert data["invalid_rows"] == 0
+        assert len(data["data"]) == 1
+        assert data["data"][0]["productName"] == "Test Product"
+        assert data["data"][0]["price"] == 100
+
+    def test_get_transformed_data_missing_file(
+        self, client, built_mapping, db_transaction
+    ):
+        """Test a mapping whose transformed data file was lost"""
+        _, _, mapping_id = built_mapping
+        data_path = db_transaction.exec_driver_sql(
+            "SELECT transformed_data_path FROM mappings WHERE id = ?", (mapping_id,)
+        ).scalar_one()
+        os.remove(data_path)
+
+        response = client.get(f"/api/mapping/{mapping_id}/transformed-data")
+        assert response.status_code == 500
+
+    def test_create_mappings_bulk(self, client, sample_csv_bytes):
+        """Test creating several mappings in one request"""
         template_response = client.post(
-            "/api/marketplace/templates", json=template_data
+            "/api/marketplace/templates", json=_NAME_TEMPLATE
         )
         template_id = template_response.json()["id"]
 
-        csv_content = "SKU,Name,Price\nSKU001,Test Product,100"
-
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            with open(temp_file_path, "rb") as f:
-                file_response = client.post(
-                    "/api/seller-file/upload",
-                    files={"file": ("test.csv", f, "text/csv")},
-                )
+        file_response = client.post(
+            "/api/seller-file/upload",
+            files={"file": ("test.csv", sample_csv_bytes, "text/csv")},
+        )
 
-            file_id = file_response.json()["id"]
+        file_id = file_response.json()["id"]
 
-            mapping_data = {
-                "name": "Test Mapping",
+        mappings_data = [
+            {
+                "name": name,
                 "marketplace_template_id": template_id,
                 "seller_file_id": file_id,
                 "column_mapping": [
                     {"seller_column": "Name", "marketplace_attribute": "productName"},
-                    {"seller_column": "Price", "marketplace_attribute": "price"},
                 ],
             }
+            for name in ["Mapping A", "Mapping B"]
+        ]
 
-            mapping_response = client.post("/api/mapping/", json=mapping_data)
-            mapping_id = mapping_response.json()["id"]
-
-            # Get transformed data
-            response = client.get(f"/api/mapping/{mapping_id}/transformed-data")
-            assert response.status_code == 200
-
-            data = response.json()
-            assert data["mapping_id"] == mapping_id
-            assert data["total_rows"] == 1
-            assert data["valid_rows"] == 1
-            assert data["invalid_rows"] == 0
-            assert len(data["data"]) == 1
-            assert data["data"][0]["productName"] == "Test Product"
-            assert data["data"][0]["price"] == 100
+        response = client.post("/api/mapping/bulk", json=mappings_data)
+        assert response.status_code == 200
 
-        finally:
-            os.unlink(temp_file_path)
+        data = response.json()
+        assert [m["name"] for m in data] == ["Mapping A", "Mapping B"]
+        assert all(m["is_valid"] for m in data)
+        assert all(m["row_count"] == 1 for m in data)
+
+        # Nothing is created if any mapping in the batch is invalid
+        mappings_data[1]["seller_file_id"] = file_id + 1
+        response = client.post("/api/mapping/bulk", json=mappings_data)
+        assert response.status_code == 404
+        assert len(client.get("/api/mapping/").json()) == 2
+
+    def test_get_mappings_pages(self, client, sample_csv_bytes):
+        """Test walking the mapping list a page at a time by last_id"""
+        template_id = client.post(
+            "/api/marketplace/templates", json=_NAME_TEMPLATE
+        ).json()["id"]
+        file_id = client.post(
+            "/api/seller-file/upload",
+            files={"file": ("test.csv", sample_csv_bytes, "text/csv")},
+        ).json()["id"]
+        created = client.post(
+            "/api/mapping/bulk",
+            json=[
+                {
+                    "name": f"Mapping {i}",
+                    "marketplace_template_id": template_id,
+                    "seller_file_id": file_id,
+                    "column_mapping": [
+                        {
+                            "seller_column": "Name",
+                            "marketplace_attribute": "productName",
+                        },
+                    ],
+                }
+                for i in range(5)
+            ],
+        ).json()
+
+        pages = []
+        last_id = 0
+        while page := client.get(
+            "/api/mapping/", params={"last_id": last_id, "limit": 2}
+        ).json():
+            pages.append([m["id"] for m in page])
+            last_id = page[-1]["id"]
+
+        # Every mapping exactly once, in id order, two per page
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert sum(pages, []) == sorted(m["id"] for m in created)
+
+        # Older clients' skip still offsets the list
+        skipped = client.get("/api/mapping/", params={"skip": 3}).json()
+        assert [m["id"] for m in skipped] == sum(pages, [])[3:]
+
+    def test_create_mappings_bulk_empty(self, client):
+        """Test an empty batch is rejected without writing anything"""
+        response = client.post("/api/mapping/bulk", json=[])
+        assert response.status_code == 400
+        assert client.get("/api/mapping/").json() == []
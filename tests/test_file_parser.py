@@ -1,3 +1,4 @@
+import io
 import pytest
 import pandas as pd
 import tempfile
@@ -6,6 +7,23 @@ from unittest.mock import Mock
 from app.services.file_parser import FileParser
 
 
+@pytest.fixture(scope="session")
+def xlsx_path(tmp_path_factory):
+    """
+    A two-row Excel file, written once: to_excel goes through openpyxl and is
+    much slower than reading the file back
+    """
+    path = tmp_path_factory.mktemp("excel") / "test.xlsx"
+    pd.DataFrame(
+        {
+            "SKU": ["SKU001", "SKU002"],
+            "Name": ["Product 1", "Product 2"],
+            "Price": [100, 200],
+        }
+    ).to_excel(path, index=False)
+    return path
+
+
 class TestFileParser:
 
     def test_parse_csv_file(self):
@@ -25,7 +43,7 @@ class TestFileParser:
             # Create mock UploadFile
             mock_file = Mock()
             mock_file.filename = "test.csv"
-            mock_file.read = Mock(return_value=csv_content.encode())
+            mock_file.read = io.BytesIO(csv_content.encode()).read
 
             # Test the parser
             columns, sample_rows, row_count = FileParser.parse_file(mock_file)
@@ -38,38 +56,20 @@ class TestFileParser:
         finally:
             os.unlink(temp_file_path)
 
-    def test_parse_excel_file(self):
+    def test_parse_excel_file(self, xlsx_path):
         """Test parsing Excel file"""
-        # Create a temporary Excel file
-        df = pd.DataFrame(
-            {
-                "SKU": ["SKU001", "SKU002"],
-                "Name": ["Product 1", "Product 2"],
-                "Price": [100, 200],
-            }
-        )
-
-        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
-            df.to_excel(temp_file.name, index=False)
-            temp_file_path = temp_file.name
-
-        try:
-            # Create mock UploadFile
-            mock_file = Mock()
-            mock_file.filename = "test.xlsx"
-            with open(temp_file_path, "rb") as f:
-                mock_file.read = Mock(return_value=f.read())
-
-            # Test the parser
-            columns, sample_rows, row_count = FileParser.parse_file(mock_file)
+        # Create mock UploadFile
+        mock_file = Mock()
+        mock_file.filename = "test.xlsx"
+        mock_file.read = io.BytesIO(xlsx_path.read_bytes()).read
 
-            assert "SKU" in columns
-            assert "Name" in columns
-            assert "Price" in columns
-            assert row_count == 2
+        # Test the parser
+        columns, sample_rows, row_count = FileParser.parse_file(mock_file)
 
-        finally:
-            os.unlink(temp_file_path)
+        assert "SKU" in columns
+        assert "Name" in columns
+        assert "Price" in columns
+        assert row_count == 2
 
     def test_get_file_data_csv(self):
         """Test reading CSV file data"""
@@ -89,19 +89,59 @@ class TestFileParser:
         finally:
             os.unlink(temp_file_path)
 
-    def test_get_file_data_excel(self):
+    def test_get_file_data_excel(self, xlsx_path):
         """Test reading Excel file data"""
-        df = pd.DataFrame({"SKU": ["SKU001"], "Name": ["Test Product"], "Price": [100]})
-
-        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
-            df.to_excel(temp_file.name, index=False)
-            temp_file_path = temp_file.name
-
-        try:
-            result_df = FileParser.get_file_data(temp_file_path, "xlsx")
-            assert len(result_df) == 1
-            assert result_df.iloc[0]["SKU"] == "SKU001"
-
-        finally:
-            os.unlink(temp_file_path)
-
+        result_df = FileParser.get_file_data(str(xlsx_path), "xlsx")
+        assert len(result_df) == 2
+        assert result_df.iloc[0]["SKU"] == "SKU001"
+
+    def test_parse_csv_duplicate_headers(self, tmp_path):
+        """Test repeated headers are renamed the way get_file_data names them"""
+        csv_path = tmp_path / "dup.csv"
+        csv_path.write_text("SKU,Name,Name,Name.1\nSKU001,A,B,C")
+
+        columns, sample_rows, row_count = FileParser.parse_path(str(csv_path), "csv")
+
+        expected = FileParser.get_file_data(str(csv_path), "csv").columns.tolist()
+        assert columns == expected == ["SKU", "Name", "Name.2", "Name.1"]
+        assert sample_rows[0] == {
+            "SKU": "SKU001",
+            "Name": "A",
+            "Name.2": "B",
+            "Name.1": "C",
+        }
+        assert row_count == 1
+
+    def test_parse_csv_ragged_rows(self, tmp_path):
+        """Test rows missing trailing fields fall back to pandas"""
+        csv_path = tmp_path / "ragged.csv"
+        csv_path.write_text("SKU,Name,Price\nSKU001,A,100\nSKU002,B")
+
+        columns, sample_rows, row_count = FileParser.parse_path(str(csv_path), "csv")
+
+        assert columns == ["SKU", "Name", "Price"]
+        assert sample_rows[0]["Price"] == 100
+        assert pd.isna(sample_rows[1]["Price"])
+        assert row_count == 2
+
+    def test_parse_csv_date_columns(self, tmp_path):
+        """Test inferred dates come back as text in the sample rows"""
+        csv_path = tmp_path / "dates.csv"
+        csv_path.write_text("SKU,Launched\nSKU001,2024-01-05\nSKU002,2024-02-01")
+
+        columns, sample_rows, row_count = FileParser.parse_path(str(csv_path), "csv")
+
+        assert columns == ["SKU", "Launched"]
+        assert [row["Launched"] for row in sample_rows] == ["2024-01-05", "2024-02-01"]
+        assert row_count == 2
+
+    def test_parse_csv_header_only(self, tmp_path):
+        """Test a CSV with a header and no rows"""
+        csv_path = tmp_path / "empty.csv"
+        csv_path.write_text("SKU, Name ,Price\n")
+
+        columns, sample_rows, row_count = FileParser.parse_path(str(csv_path), "csv")
+
+        assert columns == ["SKU", "Name", "Price"]
+        assert sample_rows == []
+        assert row_count == 0
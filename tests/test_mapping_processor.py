@@ -0,0 +1,62 @@
+import pytest
+import tempfile
+import os
+from concurrent.futures import ThreadPoolExecutor
+from app.services.mapping_processor import MappingProcessor
+from app.services.transformation import DataTransformer
+from app.services.transformed_store import TransformedDataStore
+from app.schemas import AttributeDefinition, AttributeType
+
+
+class TestMappingProcessor:
+
+    @pytest.mark.parametrize("parallel", [False, True])
+    def test_process_file_in_chunks(self, parallel):
+        """Test chunked processing matches transforming the whole file"""
+        csv_content = "Name,Price\nA,1\nB,Rs 2\nC,\nD,4.5\nE,abc"
+
+        with tempfile.NamedTemporaryFile(
+            mode="w", suffix=".csv", delete=False
+        ) as temp_file:
+            temp_file.write(csv_content)
+            temp_file_path = temp_file.name
+
+        template = {
+            "price": AttributeDefinition(
+                name="price", type=AttributeType.NUMBER, required=True
+            )
+        }
+        column_mapping = [
+            {
+                "seller_column": "Name",
+                "marketplace_attribute": "productName",
+                "transformation": "lowercase",
+            },
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+        ]
+
+        executor = ThreadPoolExecutor(max_workers=2) if parallel else None
+        data_path = None
+        try:
+            data_path, row_count, result = MappingProcessor.process_file(
+                temp_file_path,
+                "csv",
+                column_mapping,
+                template,
+                executor=executor,
+                chunksize=2,
+            )
+
+            assert row_count == 5
+            assert TransformedDataStore.load(data_path) == (
+                DataTransformer.transform_data(temp_file_path, "csv", column_mapping)
+            )
+            # Row numbers count from the start of the file, not the chunk
+            assert not result.is_valid
+            assert [error.row for error in result.errors] == [3, 5]
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            TransformedDataStore.delete(data_path)
+            os.unlink(temp_file_path)
@@ -1,77 +1,52 @@
 import pytest
 import pandas as pd
-import tempfile
-import os
 from app.services.transformation import DataTransformer
 
 
+# The CSV content is passed in place of a file path; see patch_get_file_data
+@pytest.mark.usefixtures("patch_get_file_data")
 class TestDataTransformer:
 
     def test_transform_basic_data(self):
         """Test basic data transformation"""
-        # Create temporary CSV file
         csv_content = (
             "SKU,Name,BrandName,Price,MRP\nSKU001,Test Product,Brand A,100,150"
         )
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            column_mapping = [
-                {"seller_column": "SKU", "marketplace_attribute": "sku"},
-                {"seller_column": "Name", "marketplace_attribute": "productName"},
-                {"seller_column": "BrandName", "marketplace_attribute": "brand"},
-                {"seller_column": "Price", "marketplace_attribute": "price"},
-                {"seller_column": "MRP", "marketplace_attribute": "mrp"},
-            ]
-
-            result = DataTransformer.transform_data(
-                temp_file_path, "csv", column_mapping
-            )
-
-            assert len(result) == 1
-            assert result[0]["sku"] == "SKU001"
-            assert result[0]["productName"] == "Test Product"
-            assert result[0]["brand"] == "Brand A"
-            assert result[0]["price"] == 100
-            assert result[0]["mrp"] == 150
-
-        finally:
-            os.unlink(temp_file_path)
+        column_mapping = [
+            {"seller_column": "SKU", "marketplace_attribute": "sku"},
+            {"seller_column": "Name", "marketplace_attribute": "productName"},
+            {"seller_column": "BrandName", "marketplace_attribute": "brand"},
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+            {"seller_column": "MRP", "marketplace_attribute": "mrp"},
+        ]
+
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
+
+        assert len(result) == 1
+        assert result[0]["sku"] == "SKU001"
+        assert result[0]["productName"] == "Test Product"
+        assert result[0]["brand"] == "Brand A"
+        assert result[0]["price"] == 100
+        assert result[0]["mrp"] == 150
 
     def test_transform_with_transformations(self):
         """Test data transformation with transformation rules"""
         csv_content = "Name,Price\nTest Product,100"
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            column_mapping = [
-                {
-                    "seller_column": "Name",
-                    "marketplace_attribute": "productName",
-                    "transformation": "uppercase",
-                },
-                {"seller_column": "Price", "marketplace_attribute": "price"},
-            ]
-
-            result = DataTransformer.transform_data(
-                temp_file_path, "csv", column_mapping
-            )
+        column_mapping = [
+            {
+                "seller_column": "Name",
+                "marketplace_attribute": "productName",
+                "transformation": "uppercase",
+            },
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+        ]
 
-            assert result[0]["productName"] == "TEST PRODUCT"
-            assert result[0]["price"] == 100
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
 
-        finally:
-            os.unlink(temp_file_path)
+        assert result[0]["productName"] == "TEST PRODUCT"
+        assert result[0]["price"] == 100
 
     def test_transform_images_to_array(self):
         """Test transformation of image fields to arrays"""
@@ -79,126 +54,151 @@ class TestDataTransformer:
             "Image1,Image2\nhttps://example.com/img1.jpg,https://example.com/img2.jpg"
         )
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
+        column_mapping = [
+            {"seller_column": "Image1", "marketplace_attribute": "images"}
+        ]
 
-        try:
-            column_mapping = [
-                {"seller_column": "Image1", "marketplace_attribute": "images"}
-            ]
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
 
-            result = DataTransformer.transform_data(
-                temp_file_path, "csv", column_mapping
-            )
-
-            assert result[0]["images"] == ["https://example.com/img1.jpg"]
-
-        finally:
-            os.unlink(temp_file_path)
+        assert result[0]["images"] == ["https://example.com/img1.jpg"]
 
     def test_transform_bullet_points(self):
         """Test transformation of bullet points"""
         csv_content = "BulletPoints\nPoint 1|Point 2|Point 3|Point 4|Point 5|Point 6"
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            column_mapping = [
-                {
-                    "seller_column": "BulletPoints",
-                    "marketplace_attribute": "bulletPoints",
-                }
-            ]
-
-            result = DataTransformer.transform_data(
-                temp_file_path, "csv", column_mapping
-            )
+        column_mapping = [
+            {
+                "seller_column": "BulletPoints",
+                "marketplace_attribute": "bulletPoints",
+            }
+        ]
 
-            # Should be limited to 5 points
-            assert len(result[0]["bulletPoints"]) == 5
-            assert result[0]["bulletPoints"][0] == "Point 1"
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
 
-        finally:
-            os.unlink(temp_file_path)
+        # Should be limited to 5 points
+        assert len(result[0]["bulletPoints"]) == 5
+        assert result[0]["bulletPoints"][0] == "Point 1"
 
     def test_transform_numeric_fields(self):
         """Test transformation of numeric fields"""
         csv_content = "Price,MRP,Quantity\n100.50,150.75,10"
 
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            temp_file.write(csv_content)
-            temp_file_path = temp_file.name
-
-        try:
-            column_mapping = [
-                {"seller_column": "Price", "marketplace_attribute": "price"},
-                {"seller_column": "MRP", "marketplace_attribute": "mrp"},
-                {"seller_column": "Quantity", "marketplace_attribute": "quantity"},
-            ]
-
-            result = DataTransformer.transform_data(
-                temp_file_path, "csv", column_mapping
-            )
-
-            assert isinstance(result[0]["price"], float)
-            assert result[0]["price"] == 100.5
-            assert isinstance(result[0]["mrp"], float)
-            assert result[0]["mrp"] == 150.75
-            assert isinstance(result[0]["quantity"], int)
-            assert result[0]["quantity"] == 10
-
-        finally:
-            os.unlink(temp_file_path)
-
-    def test_apply_transformations(self):
-        """Test individual transformation functions"""
-        # Test uppercase transformation
-        result = DataTransformer._apply_transformation("test", "uppercase")
-        assert result == "TEST"
-
-        # Test lowercase transformation
-        result = DataTransformer._apply_transformation("TEST", "lowercase")
-        assert result == "test"
-
-        # Test strip transformation
-        result = DataTransformer._apply_transformation("  test  ", "strip")
-        assert result == "test"
-
-        # Test split_images transformation
-        result = DataTransformer._apply_transformation(
-            "img1.jpg,img2.jpg,img3.jpg", "split_images"
+        column_mapping = [
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+            {"seller_column": "MRP", "marketplace_attribute": "mrp"},
+            {"seller_column": "Quantity", "marketplace_attribute": "quantity"},
+        ]
+
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
+
+        assert isinstance(result[0]["price"], float)
+        assert result[0]["price"] == 100.5
+        assert isinstance(result[0]["mrp"], float)
+        assert result[0]["mrp"] == 150.75
+        assert isinstance(result[0]["quantity"], int)
+        assert result[0]["quantity"] == 10
+
+    def test_transform_numeric_text_fields(self):
+        """Test numeric fields written with currency symbols and separators"""
+        csv_content = 'Price,MRP\n"Rs 1,200",₹99.50\n250,\nN/A,"1,500"'
+
+        column_mapping = [
+            {"seller_column": "Price", "marketplace_attribute": "price"},
+            {"seller_column": "MRP", "marketplace_attribute": "mrp"},
+        ]
+
+        result = DataTransformer.transform_data(csv_content, "csv", column_mapping)
+
+        assert [row["price"] for row in result] == [1200, 250, None]
+        assert [row["mrp"] for row in result] == [99.5, None, 1500]
+        assert isinstance(result[0]["price"], int)
+
+    @pytest.mark.parametrize(
+        "value,transformation,expected",
+        [
+            ("test", "uppercase", "TEST"),
+            ("TEST", "lowercase", "test"),
+            ("  test  ", "strip", "test"),
+            (
+                "img1.jpg,img2.jpg,img3.jpg",
+                "split_images",
+                ["img1.jpg", "img2.jpg", "img3.jpg"],
+            ),
+        ],
+    )
+    def test_apply_transformation(self, value, transformation, expected):
+        """Test each transformation rule"""
+        column_mapping = [
+            {
+                "seller_column": "Value",
+                "marketplace_attribute": "value",
+                "transformation": transformation,
+            }
+        ]
+
+        result = _transform(pd.DataFrame({"Value": [value]}), column_mapping)
+
+        assert result[0]["value"] == expected
+
+    @pytest.mark.parametrize(
+        "transformation,method",
+        [("uppercase", "upper"), ("lowercase", "lower"), ("strip", "strip")],
+    )
+    def test_apply_transformation_repeated_values(self, transformation, method):
+        """Test columns of repeated values (converted once per distinct value)"""
+        values = ["Red", " blue ", None, "", "   ", "Straße", "Red"] * 50
+        column_mapping = [
+            {
+                "seller_column": "Value",
+                "marketplace_attribute": "value",
+                "transformation": transformation,
+            }
+        ]
+
+        result = _transform(pd.DataFrame({"Value": values}), column_mapping)
+
+        # Same as converting every value on its own, empty results as None
+        convert = getattr(str, method)
+        assert [row["value"] for row in result] == [
+            (convert(value) or None) if isinstance(value, str) else None
+            for value in values
+        ]
+
+    @pytest.mark.parametrize(
+        "attribute,values,expected",
+        [
+            # Images and bullet points become lists
+            (
+                "images",
+                ["img1.jpg,img2.jpg", "img1.jpg"],
+                [["img1.jpg", "img2.jpg"], ["img1.jpg"]],
+            ),
+            (
+                "bulletPoints",
+                ["Point 1|Point 2|Point 3", None],
+                [["Point 1", "Point 2", "Point 3"], []],
+            ),
+            # Numeric fields become numbers, missing ones None
+            ("price", [100.5, None], [100.5, None]),
+            ("quantity", [10, None], [10, None]),
+        ],
+    )
+    def test_handle_special_case(self, attribute, values, expected):
+        """Test attribute specific handling"""
+        column_mapping = [
+            {"seller_column": "Value", "marketplace_attribute": attribute}
+        ]
+
+        result = _transform(pd.DataFrame({"Value": values}), column_mapping)
+
+        assert [row[attribute] for row in result] == expected
+        assert [type(row[attribute]) for row in result] == list(map(type, expected))
+
+
+def _transform(df, column_mapping):
+    """Transform an in-memory DataFrame the way transform_data does a file"""
+    return DataTransformer.to_records(
+        DataTransformer.transform_columns(
+            *DataTransformer.select_columns(df, column_mapping)
         )
-        assert result == ["img1.jpg", "img2.jpg", "img3.jpg"]
-
-    def test_handle_special_cases(self):
-        """Test handling of special cases"""
-        # Test images field
-        result = DataTransformer._handle_special_cases("img1.jpg,img2.jpg", "images")
-        assert result == ["img1.jpg", "img2.jpg"]
-
-        # Test single image
-        result = DataTransformer._handle_special_cases("img1.jpg", "images")
-        assert result == ["img1.jpg"]
-
-        # Test bullet points
-        result = DataTransformer._handle_special_cases(
-            "Point 1|Point 2|Point 3", "bulletPoints"
-        )
-        assert result == ["Point 1", "Point 2", "Point 3"]
-
-        # Test numeric fields
-        result = DataTransformer._handle_special_cases("100.50", "price")
-        assert result == 100.5
-
-        result = DataTransformer._handle_special_cases("10", "quantity")
-        assert result == 10
-
+    )
@@ -3,17 +3,27 @@ from app.services.validation import DataValidator
 from app.schemas import AttributeDefinition, AttributeType, ValidationError
 
 
+# Attribute definitions shared by the tests; the validator only reads them.
+# Variants are made with model_copy(update=...), which skips validation
+_PRODUCT_NAME = AttributeDefinition(
+    name="productName", type=AttributeType.STRING, required=True
+)
+_PRICE = AttributeDefinition(name="price", type=AttributeType.NUMBER, required=True)
+_GENDER = AttributeDefinition(
+    name="gender",
+    type=AttributeType.ENUM,
+    required=True,
+    enum_values=["Men", "Women", "Unisex"],
+)
+
+
 class TestDataValidator:
 
     def test_validate_required_fields(self):
         """Test validation of required fields"""
         template = {
-            "productName": AttributeDefinition(
-                name="productName", type=AttributeType.STRING, required=True
-            ),
-            "price": AttributeDefinition(
-                name="price", type=AttributeType.NUMBER, required=True
-            ),
+            "productName": _PRODUCT_NAME,
+            "price": _PRICE,
         }
 
         data = [
@@ -31,170 +41,157 @@ class TestDataValidator:
 
         assert not result.is_valid
         assert len(result.errors) == 2  # Two validation errors
-        assert any(error.field == "productName" for error in result.errors)
-        assert any(error.field == "productName" for error in result.errors)
-
-    def test_validate_string_length(self):
-        """Test validation of string length constraints"""
-        template = {
-            "productName": AttributeDefinition(
-                name="productName",
-                type=AttributeType.STRING,
-                required=True,
-                max_length=10,
-            )
-        }
-
-        data = [
-            {"productName": "Short"},  # Valid
-            {
-                "productName": "This is a very long product name that exceeds the limit"
-            },  # Invalid
-        ]
-
-        column_mapping = [
-            {"seller_column": "Name", "marketplace_attribute": "productName"}
-        ]
-
-        result = DataValidator.validate_data(data, template, column_mapping)
-
-        assert not result.is_valid
-        assert len(result.errors) == 1
-        assert "exceeds maximum length" in result.errors[0].message
-
-    def test_validate_numeric_constraints(self):
-        """Test validation of numeric constraints"""
-        template = {
-            "price": AttributeDefinition(
-                name="price",
-                type=AttributeType.NUMBER,
-                required=True,
-                min_value=0,
-                max_value=1000,
-            )
-        }
-
-        data = [
-            {"price": 100},  # Valid
-            {"price": -50},  # Invalid: below min
-            {"price": 1500},  # Invalid: above max
-            {"price": "invalid"},  # Invalid: not a number
-        ]
-
-        column_mapping = [{"seller_column": "Price", "marketplace_attribute": "price"}]
-
-        result = DataValidator.validate_data(data, template, column_mapping)
-
-        assert not result.is_valid
-        assert len(result.errors) == 3
-
-    def test_validate_enum_values(self):
-        """Test validation of enum values"""
-        template = {
-            "gender": AttributeDefinition(
-                name="gender",
-                type=AttributeType.ENUM,
-                required=True,
-                enum_values=["Men", "Women", "Unisex"],
-            )
-        }
-
-        data = [
-            {"gender": "Men"},  # Valid
-            {"gender": "Invalid"},  # Invalid
-            {"gender": "Women"},  # Valid
-        ]
-
+        assert {error.field for error in result.errors} == {"productName"}
+
+    @pytest.mark.parametrize(
+        "template,data,error_count,message",
+        [
+            pytest.param(
+                {"productName": _PRODUCT_NAME.model_copy(update={"max_length": 10})},
+                [
+                    {"productName": "Short"},  # Valid
+                    {
+                        "productName": "This is a very long product name that exceeds the limit"
+                    },  # Invalid
+                ],
+                1,
+                "exceeds maximum length",
+                id="string_length",
+            ),
+            pytest.param(
+                {
+                    "price": _PRICE.model_copy(
+                        update={"min_value": 0, "max_value": 1000}
+                    )
+                },
+                [
+                    {"price": 100},  # Valid
+                    {"price": -50},  # Invalid: below min
+                    {"price": 1500},  # Invalid: above max
+                    {"price": "invalid"},  # Invalid: not a number
+                ],
+                3,
+                None,
+                id="numeric_constraints",
+            ),
+            pytest.param(
+                {"gender": _GENDER},
+                [
+                    {"gender": "Men"},  # Valid
+                    {"gender": "Invalid"},  # Invalid
+                    {"gender": "Women"},  # Valid
+                ],
+                1,
+                "must be one of",
+                id="enum_values",
+            ),
+            pytest.param(
+                {
+                    "price": _PRICE,
+                    "mrp": AttributeDefinition(
+                        name="mrp", type=AttributeType.NUMBER, required=True
+                    ),
+                },
+                [
+                    {"price": 100, "mrp": 150},  # Valid: price <= mrp
+                    {"price": 200, "mrp": 150},  # Invalid: price > mrp
+                ],
+                1,
+                "cannot be greater than MRP",
+                id="business_rules",
+            ),
+            pytest.param(
+                {
+                    "image1": AttributeDefinition(
+                        name="image1", type=AttributeType.STRING, required=True
+                    )
+                },
+                [
+                    {"image1": "https://example.com/image.jpg"},  # Valid URL
+                    {"image1": "not-a-url"},  # Invalid URL
+                ],
+                1,
+                "must be a valid URL",
+                id="url_fields",
+            ),
+            pytest.param(
+                {
+                    "productName": _PRODUCT_NAME.model_copy(update={"max_length": 100}),
+                    "price": _PRICE.model_copy(update={"min_value": 0}),
+                    "gender": _GENDER,
+                },
+                [{"productName": "Test Product", "price": 100, "gender": "Men"}],
+                0,
+                None,
+                id="valid_data",
+            ),
+        ],
+    )
+    def test_validation_cases(self, template, data, error_count, message):
+        """Test each constraint on a few rows, counting the errors it reports"""
         column_mapping = [
-            {"seller_column": "Gender", "marketplace_attribute": "gender"}
+            {"seller_column": name, "marketplace_attribute": name} for name in template
         ]
 
         result = DataValidator.validate_data(data, template, column_mapping)
 
-        assert not result.is_valid
-        assert len(result.errors) == 1
-        assert "must be one of" in result.errors[0].message
+        assert result.is_valid == (error_count == 0)
+        assert len(result.errors) == error_count
+        if message is not None:
+            assert all(message in error.message for error in result.errors)
 
-    def test_validate_business_rules(self):
-        """Test validation of business rules"""
+    def test_validate_plain_dict_template(self):
+        """Test templates stored as plain dicts (as loaded from JSON)"""
         template = {
-            "price": AttributeDefinition(
-                name="price", type=AttributeType.NUMBER, required=True
-            ),
-            "mrp": AttributeDefinition(
-                name="mrp", type=AttributeType.NUMBER, required=True
-            ),
+            "price": {"name": "price", "type": "number", "required": True},
+            "broken": {"type": "not-a-type"},  # Unparseable, skipped
         }
 
-        data = [
-            {"price": 100, "mrp": 150},  # Valid: price <= mrp
-            {"price": 200, "mrp": 150},  # Invalid: price > mrp
-        ]
+        data = [{"price": 100, "broken": 1}, {"price": "abc"}, {}]
 
         column_mapping = [
             {"seller_column": "Price", "marketplace_attribute": "price"},
-            {"seller_column": "MRP", "marketplace_attribute": "mrp"},
+            {"seller_column": "Broken", "marketplace_attribute": "broken"},
         ]
 
         result = DataValidator.validate_data(data, template, column_mapping)
 
         assert not result.is_valid
-        assert len(result.errors) == 1
-        assert "cannot be greater than MRP" in result.errors[0].message
+        assert [(error.row, error.field) for error in result.errors] == [
+            (2, "price"),
+            (3, "price"),
+        ]
 
-    def test_validate_url_fields(self):
-        """Test validation of URL fields"""
-        template = {
-            "image1": AttributeDefinition(
-                name="image1", type=AttributeType.STRING, required=True
-            )
-        }
+    def test_validate_max_errors(self):
+        """Test that error reporting stops at max_errors"""
+        template = {"price": _PRICE}
 
-        data = [
-            {"image1": "https://example.com/image.jpg"},  # Valid URL
-            {"image1": "not-a-url"},  # Invalid URL
-        ]
+        data = [{"price": "abc"} for _ in range(5)]
 
-        column_mapping = [
-            {"seller_column": "Image1", "marketplace_attribute": "image1"}
-        ]
+        column_mapping = [{"seller_column": "Price", "marketplace_attribute": "price"}]
 
-        result = DataValidator.validate_data(data, template, column_mapping)
+        result = DataValidator.validate_data(
+            data, template, column_mapping, max_errors=3
+        )
 
         assert not result.is_valid
-        assert len(result.errors) == 1
-        assert "must be a valid URL" in result.errors[0].message
+        assert result.truncated
+        assert [error.row for error in result.errors] == [1, 2, 3]
 
-    def test_valid_data_passes_validation(self):
-        """Test that valid data passes validation"""
-        template = {
-            "productName": AttributeDefinition(
-                name="productName",
-                type=AttributeType.STRING,
-                required=True,
-                max_length=100,
-            ),
-            "price": AttributeDefinition(
-                name="price", type=AttributeType.NUMBER, required=True, min_value=0
-            ),
-            "gender": AttributeDefinition(
-                name="gender",
-                type=AttributeType.ENUM,
-                required=True,
-                enum_values=["Men", "Women", "Unisex"],
-            ),
-        }
+        result = DataValidator.validate_data(data, template, column_mapping)
+        assert len(result.errors) == 5
+        assert not result.truncated
 
-        data = [{"productName": "Test Product", "price": 100, "gender": "Men"}]
+    def test_validate_row_offset(self):
+        """Test row numbers are shifted by row_offset for chunked data"""
+        template = {"price": _PRICE}
 
-        column_mapping = [
-            {"seller_column": "Name", "marketplace_attribute": "productName"},
-            {"seller_column": "Price", "marketplace_attribute": "price"},
-            {"seller_column": "Gender", "marketplace_attribute": "gender"},
-        ]
+        data = [{"price": 1}, {"price": None}]
 
-        result = DataValidator.validate_data(data, template, column_mapping)
+        column_mapping = [{"seller_column": "Price", "marketplace_attribute": "price"}]
 
-        assert result.is_valid
-        assert len(result.errors) == 0
+        result = DataValidator.validate_data(
+            data, template, column_mapping, row_offset=100
+        )
 
+        assert [error.row for error in result.errors] == [102]